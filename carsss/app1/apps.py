@@ -5,3 +5,6 @@ class App1Config(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app1'
 
+    def ready(self):
+        from . import signals  # noqa: F401  (connects the model signal handlers)
+        from . import checks  # noqa: F401  (registers the database version check)
@@ -0,0 +1,385 @@
+# Native async versions of the login, registration and CRUD endpoints. They are
+# served instead of the APIView versions in app1/views.py when settings.ASYNC_VIEWS
+# is on (the default under ASGI). Password hashing runs on the hashing pool and
+# queries go through the async ORM, so a request does not hold one of the few
+# threads every sync view shares while it waits.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.db import IntegrityError
+from django.db.models import Q
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import (
+    APIException, AuthenticationFailed, NotAuthenticated, PermissionDenied, ValidationError,
+)
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from . import metrics
+from .hashers import acheck_password, amake_password
+from .middleware import timed
+from .models import EmployeesModel, Customer, CarWashService, Reviewmodel
+from .permissions import IsAdminEmployee
+from .renderers import FastJSONRenderer
+from .response_cache import acached_response
+from .routers import use_replica
+from .serializer import (
+    EmployeeSerializer, EmployeeLoginSerializer, EmpManage,
+    CustomerSerilizer, CustomerRegisterSerializer, CustomerLoginSerializer,
+    CarWashServiceSerializer, ReviewSerializer, unique_violation,
+)
+from .utils import parse_request_data, json_response
+from .views import (
+    get_tokens_for_user, get_refresh_token_for_customer, save_service_batch,
+    ServicePagination, ReviewPagination, CarWashServiceView as SyncCarWashServiceView,
+)
+
+
+# Base for the async endpoints; like APIView they take JSON or form data without a CSRF token
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncView(View):
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            self.data = parse_request_data(request)
+        except ValueError as e:
+            return json_response({"detail": f"JSON parse error - {e}"}, status=400)
+        return await super().dispatch(request, *args, **kwargs)
+
+
+# EmployeeSerializer.create and CustomerRegisterSerializer.create, hashing on the
+# hashing pool. One INSERT each; a duplicate name or email is reported by the
+# unique constraint and raised as the ValidationError the serializer would give.
+async def acreate_employee(validated_data):
+    try:
+        return await EmployeesModel.objects.acreate_user(**validated_data)
+    except IntegrityError:
+        raise unique_violation(EmployeesModel, "employee_name") from None
+
+
+async def acreate_customer(validated_data):
+    data = dict(validated_data)
+    data.pop("password_confirm", None)
+    data["password"] = await amake_password(data["password"])
+    try:
+        return await Customer.objects.acreate(**data)
+    except IntegrityError:
+        raise unique_violation(Customer, "email") from None
+
+
+# Signup for employees
+class EmpRegisterView(AsyncView):
+
+    async def post(self, request):
+        serializer = EmployeeSerializer(data=self.data)
+        if serializer.is_valid():  # No database lookups: uniqueness is checked by the INSERT
+            try:
+                await acreate_employee(serializer.validated_data)
+            except ValidationError as e:
+                return json_response(e.detail, status=400)
+            return json_response({"message": "success"}, status=201)
+        return json_response(serializer.errors, status=400)
+
+
+# Login for employees
+class EmployeeLoginView(AsyncView):
+
+    async def post(self, request):
+        serializer = EmployeeLoginSerializer(data=self.data)
+        if not serializer.is_valid():
+            return json_response(serializer.errors, status=400)
+        password = serializer.validated_data["password"]
+        employee = await EmployeesModel.objects.filter(
+            employee_name=serializer.validated_data["employee_name"]).afirst()
+        if employee is None:
+            # Hash anyway so unknown names take as long as wrong passwords (as ModelBackend does)
+            await amake_password(password)
+        else:
+            valid, new_hash = await acheck_password(password, employee.password)
+            if valid and employee.is_active:
+                if new_hash:
+                    employee.password = new_hash
+                    await employee.asave(update_fields=["password"])
+                metrics.LOGINS.inc(account="employee", result="success")
+                token = await sync_to_async(get_tokens_for_user)(employee)
+                return json_response({"token": token, "message": "success"}, status=200)
+        metrics.LOGINS.inc(account="employee", result="failure")
+        return json_response(
+            {"error": {"non_field_error": ["Email or password is not valid"]}}, status=401)
+
+
+# Signup for customer
+class CustomerRegisterView(AsyncView):
+
+    async def post(self, request):
+        serializer = CustomerRegisterSerializer(data=self.data)
+        if not await sync_to_async(serializer.is_valid)():
+            return json_response(serializer.errors, status=400)
+        try:
+            customer = await acreate_customer(serializer.validated_data)
+        except ValidationError as e:
+            return json_response(e.detail, status=400)
+        return json_response({
+            "message": "Customer registered successfully!",
+            "customer": {
+                "email": customer.email,
+                "first_name": customer.first_name,
+                "last_name": customer.last_name
+            }
+        }, status=201)
+
+
+# Login for customer
+class CustomerLoginView(AsyncView):
+
+    async def post(self, request):
+        serializer = CustomerLoginSerializer(data=self.data)
+        if not serializer.is_valid():
+            return json_response(serializer.errors, status=400)
+        customer = await Customer.objects.filter(email=serializer.validated_data["email"]).afirst()
+        if customer is None:
+            metrics.LOGINS.inc(account="customer", result="failure")
+            return json_response({"detail": "Customer not found."}, status=400)
+        valid, new_hash = await acheck_password(serializer.validated_data["password"], customer.password)
+        if not valid:
+            metrics.LOGINS.inc(account="customer", result="failure")
+            return json_response({"detail": "Invalid credentials."}, status=400)
+        metrics.LOGINS.inc(account="customer", result="success")
+        if new_hash:
+            customer.password = new_hash
+            await customer.asave(update_fields=["password"])
+        refresh = await sync_to_async(get_refresh_token_for_customer)(customer)
+        return json_response({"access": str(refresh.access_token), "refresh": str(refresh)}, status=200)
+
+
+# Base for the async endpoints that need a logged-in user. Authenticates the JWT
+# and checks permission_classes like APIView does, with the user loaded through
+# the async ORM, and turns DRF exceptions into the same JSON error responses.
+class AsyncAPIView(AsyncView):
+    permission_classes = [IsAuthenticated]
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            request.user = await self.authenticate(request) or AnonymousUser()
+            self.check_permissions(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except Http404 as e:
+            return json_response({"detail": str(e)}, status=404)
+        except APIException as e:
+            data = e.detail if isinstance(e.detail, (list, dict)) else {"detail": e.detail}
+            response = json_response(data, status=e.status_code)
+            if e.status_code == 401:
+                response["WWW-Authenticate"] = self.authenticator.authenticate_header(request)
+            return response
+
+    @property
+    def authenticator(self):
+        return api_settings.DEFAULT_AUTHENTICATION_CLASSES[0]()
+
+    async def authenticate(self, request):
+        """The employee (or stateless TokenUser) the bearer token belongs to, or None."""
+        authenticator = self.authenticator
+        header = authenticator.get_header(request)
+        if header is None:
+            return None
+        raw_token = authenticator.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = authenticator.get_validated_token(raw_token)
+        if isinstance(authenticator, JWTStatelessUserAuthentication):
+            return authenticator.get_user(validated_token)  # Built from the token, no query
+
+        # JWTAuthentication.get_user with an async lookup
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken("Token contained no recognizable user identification") from e
+        try:
+            user = await EmployeesModel.objects.aget(**{jwt_settings.USER_ID_FIELD: user_id})
+        except EmployeesModel.DoesNotExist as e:
+            raise AuthenticationFailed("User not found", code="user_not_found") from e
+        if jwt_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        if jwt_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+                jwt_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed("The user's password has been changed.", code="password_changed")
+        return user
+
+    def check_permissions(self, request):
+        for permission in (permission_class() for permission_class in self.permission_classes):
+            if not permission.has_permission(request, self):
+                if not request.user.is_authenticated:
+                    raise NotAuthenticated()
+                raise PermissionDenied(getattr(permission, "message", None))
+
+    async def is_valid(self, serializer):
+        """Validate in a thread; field validators and relations query the database."""
+        return await sync_to_async(serializer.is_valid)()
+
+    async def paginate(self, paginator, queryset, represent, request):
+        """Paginated data for one page of ``queryset``, each page turned into data by
+        ``represent``. DRF's paginators are sync, so the page query and its
+        serialization run in a thread."""
+        def page_data():
+            page = paginator.paginate_queryset(queryset, Request(request), view=self)
+            with timed("serialize"):
+                data = represent(page)
+            return paginator.get_paginated_response(data).data
+        return await sync_to_async(page_data)()
+
+
+def astream_services(services, chunk_size=2000):
+    """Async ``views.stream_services``: NDJSON rows read with async iteration."""
+    serializer = CarWashServiceSerializer()
+    encoder = JSONEncoder(separators=(",", ":"))
+    services = services.using(services.db)  # Keep the database chosen inside the view
+
+    async def rows():
+        ordered = services.order_by(*ServicePagination.ordering)
+        async for service in ordered.aiterator(chunk_size=chunk_size):
+            yield encoder.encode(serializer.to_representation(service)) + "\n"
+
+    return StreamingHttpResponse(rows(), content_type="application/x-ndjson")
+
+
+# Crud for emp if admin is true
+class EmployeeAPIView(AsyncAPIView):
+    permission_classes = [IsAuthenticated, IsAdminEmployee]
+
+    @acached_response("employees")
+    async def get(self, request):
+        employees = [row async for row in EmployeeSerializer.project(EmployeesModel.objects.all())]
+        with timed("serialize"):
+            data = EmployeeSerializer.represent(employees)
+        return json_response(data, renderer_class=FastJSONRenderer)
+
+    async def post(self, request):
+        serializer = EmployeeSerializer(data=self.data)
+        if not await self.is_valid(serializer):
+            return json_response(serializer.errors, status=400)
+        serializer.instance = await acreate_employee(serializer.validated_data)
+        return json_response(serializer.data, status=201)
+
+    async def put(self, request, pk):
+        employee = await aget_object_or_404(EmployeesModel, pk=pk)
+        serializer = EmpManage(employee, data=self.data)
+        if not await self.is_valid(serializer):
+            return json_response(serializer.errors, status=400)
+        for field, value in serializer.validated_data.items():
+            setattr(employee, field, value)
+        await employee.asave()
+        return json_response(serializer.data)
+
+    async def delete(self, request, pk):
+        try:
+            employee = await EmployeesModel.objects.aget(pk=pk)
+        except EmployeesModel.DoesNotExist:
+            return json_response({"detail": "Employee not found."}, status=404)
+        await employee.adelete()
+        return json_response({"detail": "Employee deleted."}, status=204)
+
+
+# Crud operation for Customer
+class CustomerAPI(AsyncAPIView):
+    permission_classes = [IsAuthenticated, IsAdminEmployee]  # Only admin employees
+
+    @acached_response("customers")
+    async def get(self, request):
+        customers = CustomerSerilizer.project(
+            Customer.objects.filter(Q(employee_id=request.user.id) | Q(employee__isnull=True)))
+        data = CustomerSerilizer.represent([row async for row in customers])
+        return json_response(data, renderer_class=FastJSONRenderer)
+
+    async def post(self, request):
+        serializer = CustomerRegisterSerializer(data=self.data)
+        if not await self.is_valid(serializer):
+            return json_response(serializer.errors, status=400)
+        await acreate_customer(serializer.validated_data)
+        return json_response(serializer.data, status=201)
+
+    async def put(self, request, pk):
+        customer = await aget_object_or_404(Customer, pk=pk)
+        serializer = CustomerRegisterSerializer(customer, data=self.data)
+        if not await self.is_valid(serializer):
+            return json_response(serializer.errors, status=400)
+        data = dict(serializer.validated_data)
+        data.pop("password_confirm", None)
+        data["password"] = await amake_password(data["password"])
+        for field, value in data.items():
+            setattr(customer, field, value)
+        try:
+            await customer.asave()
+        except IntegrityError:
+            raise unique_violation(Customer, "email") from None
+        return json_response(serializer.data)
+
+    async def delete(self, request, pk):
+        try:
+            customer = await Customer.objects.aget(pk=pk)
+        except Customer.DoesNotExist:
+            return json_response({"detail": "customer not found."}, status=404)
+        await customer.adelete()
+        return json_response({"detail": "customer deleted."}, status=204)
+
+
+# Making services record here
+class CarWashServiceView(AsyncAPIView):
+    permission_classes = [IsAuthenticated, IsAdminEmployee]
+    BULK_MAX_ITEMS = SyncCarWashServiceView.BULK_MAX_ITEMS
+
+    @acached_response("services")
+    @use_replica
+    async def get(self, request):
+        empid = request.GET.get("empid", None)
+        if empid:
+            services = CarWashService.objects.filter(employee__employee_name=empid)
+        else:
+            services = CarWashService.objects.all()
+        if request.GET.get("stream", "").lower() in ("1", "true", "ndjson"):
+            return astream_services(CarWashServiceSerializer.setup_eager_loading(services))
+        data = await self.paginate(ServicePagination(), CarWashServiceSerializer.project(services),
+                                   CarWashServiceSerializer.represent, request)
+        return json_response(data, renderer_class=FastJSONRenderer)
+
+    async def post(self, request):
+        if isinstance(self.data, list):  # End-of-shift batch upload
+            # One transaction around the INSERT and the rollup update, so it runs in a thread
+            errors, services = await sync_to_async(save_service_batch)(self.data, self.BULK_MAX_ITEMS)
+            if errors:
+                return json_response(errors, status=400)
+            return json_response({"message": "Car wash services created successfully!",
+                                  "ids": [service.id for service in services]}, status=201)
+        serializer = CarWashServiceSerializer(data=self.data)
+        if not await self.is_valid(serializer):
+            return json_response(serializer.errors, status=400)
+        service = await CarWashService.objects.acreate(**serializer.validated_data)
+        return json_response({"message": "Car wash service created successfully!", "id": service.id},
+                             status=201)
+
+
+class ReviewAPI(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+
+    @use_replica
+    async def get(self, request):
+        return json_response(
+            await self.paginate(ReviewPagination(), Reviewmodel.objects.all(),
+                                lambda page: ReviewSerializer(page, many=True).data, request))
+
+    async def post(self, request):
+        serializer = ReviewSerializer(data=self.data)
+        if not serializer.is_valid():  # No database lookups in these validators
+            return json_response(serializer.errors, status=400)
+        review = await Reviewmodel.objects.acreate(**serializer.validated_data)
+        return json_response({"message": "review and rating created successfully!",
+                              "review": review.review,
+                              "ratings": review.ratings}, status=201)
@@ -0,0 +1,19 @@
+from django.core.checks import Error, Tags, register
+from django.db import connections
+
+POSTGRES_MIN_VERSION = 150000  # 15.0, for UNIQUE NULLS NOT DISTINCT
+
+
+@register(Tags.database)
+def check_postgres_version(databases=None, **kwargs):
+    """DailySalesRollup's unique constraint relies on NULLS NOT DISTINCT (PostgreSQL 15+)."""
+    errors = []
+    for alias in databases or ():
+        connection = connections[alias]
+        if connection.vendor == "postgresql" and connection.pg_version < POSTGRES_MIN_VERSION:
+            errors.append(Error(
+                f"Database '{alias}' runs PostgreSQL {connection.pg_version // 10000}; 15 or later is required.",
+                hint="DailySalesRollup's unique constraint needs NULLS NOT DISTINCT to keep one row per key.",
+                id="app1.E001",
+            ))
+    return errors
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, PBKDF2PasswordHasher, ScryptPasswordHasher,
+    check_password, make_password,
+)
+
+# Hashers whose cost comes from settings.PASSWORD_HASH_PARAMS. Raising a cost makes
+# must_update() true for older hashes, so they are upgraded on the next login.
+
+
+def _param(name, default):
+    return getattr(settings, "PASSWORD_HASH_PARAMS", {}).get(name, default)
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return _param("pbkdf2_iterations", PBKDF2PasswordHasher.iterations)
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return _param("scrypt_work_factor", ScryptPasswordHasher.work_factor)
+
+    @property
+    def block_size(self):
+        return _param("scrypt_block_size", ScryptPasswordHasher.block_size)
+
+    @property
+    def parallelism(self):
+        return _param("scrypt_parallelism", ScryptPasswordHasher.parallelism)
+
+    @property
+    def maxmem(self):
+        # OpenSSL refuses more than 32 MiB unless told otherwise; scrypt needs 128 * n * r
+        return max(32 * 1024 * 1024, 2 * 128 * self.work_factor * self.block_size)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return _param("argon2_time_cost", Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return _param("argon2_memory_cost", Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return _param("argon2_parallelism", Argon2PasswordHasher.parallelism)
+
+
+# Worker pool for hashing from async views, sized by settings.PASSWORD_HASH_POOL_SIZE
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def hash_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_POOL_SIZE, thread_name_prefix="password-hash")
+    return _executor
+
+
+def _check_password(password, encoded):
+    upgraded = []
+    valid = check_password(password, encoded, setter=lambda raw: upgraded.append(make_password(raw)))
+    return valid, (upgraded[0] if upgraded else None)
+
+
+async def amake_password(password):
+    """make_password run on the hashing pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(hash_executor(), make_password, password)
+
+
+async def acheck_password(password, encoded):
+    """check_password run on the hashing pool.
+
+    Returns ``(valid, new_hash)``; ``new_hash`` is set when the stored hash is
+    outdated, and the caller saves it (the pool threads do not touch the database).
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(hash_executor(), _check_password, password, encoded)
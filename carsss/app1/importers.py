@@ -0,0 +1,123 @@
+# Bulk customer import shared by the import_customers command and the
+# CustomerImportView endpoint. Rows are streamed from a CSV or JSONL file and
+# handled a chunk at a time: validated, passwords hashed on an executor (a
+# process pool from the command, the hashing thread pool from the endpoint),
+# then written with one bulk INSERT per chunk that resolves duplicates on email.
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+
+from .models import Customer
+from .response_cache import invalidate
+from .serializer import CustomerImportSerializer
+
+FORMATS = ("csv", "jsonl")
+MAX_REPORTED_ERRORS = 100  # Invalid rows listed in the result; all of them are counted
+
+
+def detect_format(filename):
+    """File format from its extension, or None when it is not recognised."""
+    extension = os.path.splitext(filename or "")[1].lower()
+    return {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}.get(extension)
+
+
+def read_rows(stream, file_format):
+    """Yield ``(line number, row)`` from a text stream; rows that cannot be parsed are ``None``."""
+    if file_format == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif file_format == "jsonl":
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else None
+    else:
+        raise ValueError(f"Unsupported format '{file_format}'.")
+
+
+def init_hash_worker(settings_module):
+    """ProcessPoolExecutor initializer; spawned workers start without Django configured."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    django.setup()
+
+
+def import_customers(rows, executor=None, chunk_size=1000, update_existing=False, progress=None):
+    """Import ``(line number, row)`` pairs from ``read_rows`` into Customer.
+
+    Existing emails are skipped, or with ``update_existing`` overwritten with the
+    imported names and password. ``progress`` is called with the running result
+    after every chunk. Returns the result: counts of rows, created, updated,
+    skipped and invalid rows, the first errors, elapsed seconds and rows per second.
+    """
+    result = {"rows": 0, "created": 0, "updated": 0, "skipped": 0, "invalid": 0,
+              "errors": [], "seconds": 0.0, "rows_per_sec": 0.0}
+    start = time.perf_counter()
+    rows = iter(rows)
+    try:
+        while chunk := list(islice(rows, chunk_size)):
+            _import_chunk(chunk, executor, update_existing, result)
+            result["seconds"] = round(time.perf_counter() - start, 3)
+            result["rows_per_sec"] = round(result["rows"] / result["seconds"], 1) if result["seconds"] else 0.0
+            if progress is not None:
+                progress(result)
+    finally:
+        if result["created"] or result["updated"]:
+            invalidate("customers")  # bulk_create skips the signals
+    return result
+
+
+def _import_chunk(chunk, executor, update_existing, result):
+    valid = {}  # By email; a later row for the same email replaces an earlier one
+    for line_number, row in chunk:
+        result["rows"] += 1
+        serializer = CustomerImportSerializer(data=row) if row is not None else None
+        if serializer is None or not serializer.is_valid():
+            result["invalid"] += 1
+            if len(result["errors"]) < MAX_REPORTED_ERRORS:
+                errors = serializer.errors if serializer is not None else {"non_field_errors": ["Unreadable row."]}
+                result["errors"].append({"line": line_number, "errors": errors})
+            continue
+        if serializer.validated_data["email"] in valid:
+            result["skipped"] += 1
+        valid[serializer.validated_data["email"]] = serializer.validated_data
+    if not valid:
+        return
+
+    existing = set(Customer.objects.filter(email__in=valid).values_list("email", flat=True))
+    if not update_existing:
+        # Rows that will be ignored are not worth hashing
+        result["skipped"] += len(existing)
+        for email in existing:
+            del valid[email]
+        if not valid:
+            return
+
+    records = list(valid.values())
+    passwords = [record["password"] for record in records]
+    if executor is None:
+        hashed = map(make_password, passwords)
+    else:
+        # chunksize batches the work sent to each process (threads ignore it)
+        hashed = executor.map(make_password, passwords, chunksize=max(1, len(passwords) // 64))
+    customers = [Customer(**{**record, "password": password}) for record, password in zip(records, hashed)]
+
+    if update_existing:
+        Customer.objects.bulk_create(
+            customers, update_conflicts=True, unique_fields=["email"],
+            update_fields=["first_name", "last_name", "password"])
+    else:
+        # ignore_conflicts covers emails registered since the lookup above
+        Customer.objects.bulk_create(customers, ignore_conflicts=True)
+    result["updated"] += len(existing) if update_existing else 0
+    result["created"] += len(customers) - (len(existing) if update_existing else 0)
+
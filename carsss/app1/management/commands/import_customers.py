@@ -0,0 +1,65 @@
+import io
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app1.importers import FORMATS, detect_format, import_customers, init_hash_worker, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Import customers from a CSV (with an email,first_name,last_name,password header) "
+        "or JSONL file. Passwords are hashed in parallel worker processes and rows are "
+        "inserted in bulk; existing emails are skipped unless --update is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, or - for standard input.")
+        parser.add_argument("--format", choices=FORMATS,
+                            help="File format; by default taken from the file extension.")
+        parser.add_argument("--chunk-size", type=int, default=1000,
+                            help="Rows validated, hashed and inserted together.")
+        parser.add_argument("--processes", type=int, default=os.cpu_count() or 1,
+                            help="Password hashing processes (1 hashes in this process).")
+        parser.add_argument("--update", action="store_true",
+                            help="Overwrite names and passwords of customers that already exist.")
+
+    def handle(self, *args, **options):
+        file_format = options["format"] or detect_format(options["path"])
+        if file_format is None:
+            raise CommandError("Cannot tell the file format from its name; pass --format.")
+        if options["path"] == "-":
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", newline="")
+        else:
+            try:
+                stream = open(options["path"], encoding="utf-8-sig", newline="")
+            except OSError as e:
+                raise CommandError(str(e))
+
+        def progress(result):
+            self.stderr.write(f"{result['rows']} rows, {result['rows_per_sec']} rows/s", ending="\r")
+
+        executor = None
+        if options["processes"] > 1:
+            executor = ProcessPoolExecutor(
+                options["processes"], initializer=init_hash_worker,
+                initargs=(os.environ.get("DJANGO_SETTINGS_MODULE", "carsss.settings"),))
+        try:
+            with stream:
+                result = import_customers(
+                    read_rows(stream, file_format), executor=executor,
+                    chunk_size=options["chunk_size"], update_existing=options["update"],
+                    progress=progress)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.stderr.write("")
+
+        for error in result["errors"]:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['rows']} rows in {result['seconds']}s ({result['rows_per_sec']} rows/s): "
+            f"{result['created']} created, {result['updated']} updated, "
+            f"{result['skipped']} skipped, {result['invalid']} invalid."))
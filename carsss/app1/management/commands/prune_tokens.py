@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired OutstandingToken rows and their BlacklistedToken entries in batches. "
+        "Meant to run periodically (e.g. hourly from cron) so the token tables stay small."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000,
+                            help="Rows deleted per statement, to keep locks short.")
+
+    def handle(self, *args, **options):
+        now = aware_utcnow()
+        expired = OutstandingToken.objects.filter(expires_at__lte=now)
+        outstanding = blacklisted = 0
+        while True:
+            ids = list(expired.values_list("pk", flat=True)[:options["batch_size"]])
+            if not ids:
+                break
+            # Blacklist rows cascade from their outstanding token
+            _, deleted = OutstandingToken.objects.filter(pk__in=ids).delete()
+            outstanding += deleted.get(OutstandingToken._meta.label, 0)
+            blacklisted += deleted.get(BlacklistedToken._meta.label, 0)
+        self.stdout.write(self.style.SUCCESS(
+            f"Pruned {outstanding} expired tokens ({blacklisted} blacklisted)."))
@@ -0,0 +1,22 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app1.models import DailySalesRollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DailySalesRollup table from the car wash service records."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="First day to rebuild (YYYY-MM-DD).")
+        parser.add_argument("--end", help="Last day to rebuild (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options["start"]) if options["start"] else None
+            end = date.fromisoformat(options["end"]) if options["end"] else None
+        except ValueError as e:
+            raise CommandError(str(e))
+        rows = DailySalesRollup.rebuild(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} rollup rows."))
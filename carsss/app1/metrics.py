@@ -0,0 +1,225 @@
+"""In-process metrics with a Prometheus text endpoint.
+
+Counters and histograms live in plain dicts guarded by one lock, so recording a
+sample costs a dict lookup. With several worker processes, set
+settings.METRICS_MULTIPROC_DIR: every process then writes its samples to
+``<dir>/<pid>.json`` at most every METRICS_FLUSH_INTERVAL seconds, and the
+endpoint adds up the files of all processes. Clear the directory when the
+server is restarted, as the files of exited workers are kept so totals never go
+backwards.
+"""
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()  # One thread writes this process's file at a time
+_registry = {}
+_last_flush = 0.0
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.samples = {}  # label values -> total
+        _registry[name] = self
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with _lock:
+            self.samples[key] = self.samples.get(key, 0) + amount
+
+    @staticmethod
+    def merge(total, value):
+        return (total or 0) + value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.samples = {}  # label values -> [count per bucket (last one +Inf), sum]
+        _registry[name] = self
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)  # First bucket whose upper bound holds value
+        with _lock:
+            sample = self.samples.get(key)
+            if sample is None:
+                sample = self.samples[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            sample[0][index] += 1
+            sample[1] += value
+
+    @staticmethod
+    def merge(total, value):
+        if total is None:
+            return [list(value[0]), value[1]]
+        return [[a + b for a, b in zip(total[0], value[0])], total[1] + value[1]]
+
+
+REQUESTS = Counter("http_requests_total", "Requests handled, by view, method and status.",
+                   ("view", "method", "status"))
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Time to produce the response, by view and method.",
+                            ("view", "method"))
+REQUEST_QUERIES = Histogram("db_queries_per_request", "SQL queries run per request, by view.",
+                            ("view",), buckets=QUERY_COUNT_BUCKETS)
+REQUEST_DB_TIME = Histogram("db_time_per_request_seconds", "Time spent in SQL per request, by view.",
+                            ("view",))
+LOGINS = Counter("login_attempts_total", "Login attempts, by account type and result.",
+                 ("account", "result"))
+TOKEN_BLACKLIST = Counter("token_blacklist_operations_total",
+                          "Refresh token blacklist operations: blacklist, and checks answered from the "
+                          "cache or the database.", ("operation",))
+
+
+def snapshot():
+    """Samples of this process, as ``{metric name: [[label values, value], ...]}``."""
+    with _lock:
+        return {
+            name: [[list(key), [list(value[0]), value[1]] if metric.kind == "histogram" else value]
+                   for key, value in metric.samples.items()]
+            for name, metric in _registry.items()
+        }
+
+
+def _write(directory):
+    """Write the samples to ``<directory>/<pid>.json``; the caller holds _flush_lock."""
+    global _last_flush
+    _last_flush = time.monotonic()
+    fd, temporary = tempfile.mkstemp(dir=directory, prefix=f"{os.getpid()}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as file:
+            json.dump(snapshot(), file)
+        os.replace(temporary, Path(directory) / f"{os.getpid()}.json")  # Readers never see a half-written file
+    except BaseException:
+        try:
+            os.unlink(temporary)
+        except OSError:
+            pass
+        raise
+
+
+def flush():
+    """Write this process's samples to the multiprocess directory, if one is set.
+
+    Failures are logged, not raised: the metrics are best effort.
+    """
+    directory = settings.METRICS_MULTIPROC_DIR
+    if not directory:
+        return
+    with _flush_lock:
+        try:
+            _write(directory)
+        except OSError:
+            logger.exception("Could not write the metrics to %s", directory)
+
+
+def maybe_flush():
+    """``flush`` when METRICS_FLUSH_INTERVAL has passed; called after every request,
+    so it neither waits for another thread's flush nor raises."""
+    directory = settings.METRICS_MULTIPROC_DIR
+    if not directory or time.monotonic() - _last_flush < settings.METRICS_FLUSH_INTERVAL:
+        return
+    if not _flush_lock.acquire(blocking=False):
+        return  # Another thread is writing the file
+    try:
+        _write(directory)
+    except Exception:
+        logger.exception("Could not write the metrics to %s", directory)
+    finally:
+        _flush_lock.release()
+
+
+atexit.register(flush)
+
+
+def collect():
+    """Samples of every process (or just this one), as ``{metric name: {label values: value}}``."""
+    if settings.METRICS_MULTIPROC_DIR:
+        flush()
+        snapshots = []
+        for path in Path(settings.METRICS_MULTIPROC_DIR).glob("*.json"):
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue  # Removed or replaced while listing
+    else:
+        snapshots = [snapshot()]
+    merged = {name: {} for name in _registry}
+    for samples in snapshots:
+        for name, rows in samples.items():
+            metric = _registry.get(name)
+            if metric is None:
+                continue
+            for key, value in rows:
+                key = tuple(key)
+                merged[name][key] = metric.merge(merged[name].get(key), value)
+    return merged
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def exposition():
+    """All metrics in the Prometheus text format."""
+    lines = []
+    for name, samples in collect().items():
+        metric = _registry[name]
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for key, value in sorted(samples.items()):
+            if metric.kind == "counter":
+                lines.append(f"{name}{_labels(metric.labelnames, key)} {value}")
+                continue
+            counts, total = value
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{name}_bucket{_labels(metric.labelnames, key, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{_labels(metric.labelnames, key)} {total}")
+            lines.append(f"{name}_count{_labels(metric.labelnames, key)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint; requires ``Authorization: Bearer <METRICS_TOKEN>``.
+
+    Closed while METRICS_TOKEN is empty: behind a reverse proxy every request
+    comes from the local host, so the client address cannot stand in for it.
+    """
+    if not settings.METRICS_TOKEN:
+        return HttpResponse(status=403)
+    if not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {settings.METRICS_TOKEN}"):
+        return HttpResponse(status=401)
+    return HttpResponse(exposition(), content_type=CONTENT_TYPE)
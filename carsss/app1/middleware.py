@@ -0,0 +1,201 @@
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from . import metrics
+
+logger = logging.getLogger("app1.performance")
+
+# Timings of the request being handled (one per request thread or async task).
+# A dict so that queries run through sync_to_async, which works on a copy of the
+# context, are still added to the request's totals.
+_timings = ContextVar("request_timings", default=None)
+
+
+def _time_query(execute, sql, params, many, context):
+    """Execute wrapper adding each query's duration to the current request's timings."""
+    timings = _timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        timings["db"] += duration
+        timings["queries"].append((duration, sql))
+
+
+def _instrument(connection, **kwargs):
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+def _instrument_connections():
+    # Connections opened later get the wrapper as they connect
+    connection_created.connect(_instrument, dispatch_uid="app1.performance")
+    for connection in connections.all(initialized_only=True):
+        _instrument(connection)
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block to the request's ``name`` timing (e.g. "serialize")."""
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+
+class PerformanceTimingMiddleware:
+    """Time each request's SQL, serialization and rendering (settings.PERF_TIMING).
+
+    Adds a Server-Timing header, logs one JSON record per request to the
+    "app1.performance" logger, and logs the slowest queries of a sample of the
+    requests slower than PERF_SLOW_REQUEST_MS. When PERF_TIMING is off Django
+    drops the middleware at startup, so it costs nothing.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PERF_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        _instrument_connections()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, token = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _timings.reset(token)
+        self.finish(request, response, timings)
+        return response
+
+    async def __acall__(self, request):
+        timings, token = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _timings.reset(token)
+        self.finish(request, response, timings)
+        return response
+
+    def start(self):
+        timings = {"start": time.perf_counter(), "db": 0.0, "queries": []}
+        return timings, _timings.set(timings)
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; time that step
+        timings = _timings.get()
+        if timings is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                timings["render"] = timings.get("render", 0.0) + time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, request, response, timings):
+        total = time.perf_counter() - timings.pop("start")
+        queries = timings.pop("queries")
+        phases = {"db": timings.pop("db"), **timings}
+        if settings.PERF_TIMING_HEADER:
+            response["Server-Timing"] = ", ".join(
+                [f"total;dur={total * 1000:.1f}",
+                 f'db;dur={phases["db"] * 1000:.1f};desc="{len(queries)} queries"']
+                + [f"{name};dur={duration * 1000:.1f}" for name, duration in phases.items() if name != "db"])
+
+        slow = total * 1000 >= settings.PERF_SLOW_REQUEST_MS
+        if not (slow or logger.isEnabledFor(logging.INFO)):
+            return
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": getattr(request.resolver_match, "view_name", None),
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 2),
+            "queries": len(queries),
+            **{f"{name}_ms": round(duration * 1000, 2) for name, duration in phases.items()},
+        }
+        if slow and random.random() < settings.PERF_SLOW_SAMPLE_RATE:
+            record["slow_queries"] = [
+                {"ms": round(duration * 1000, 2), "sql": sql}
+                for duration, sql in sorted(queries, key=lambda query: query[0], reverse=True)[:10]]
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
+
+
+class MetricsMiddleware:
+    """Count requests and record their latency and SQL queries per view in app1.metrics
+    (settings.METRICS_ENABLED)."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        _instrument_connections()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        timings, token = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                _timings.reset(token)
+        self.finish(request, response, timings, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        timings, token = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                _timings.reset(token)
+        self.finish(request, response, timings, time.perf_counter() - started)
+        return response
+
+    def start(self):
+        timings = _timings.get()
+        if timings is not None:  # PerformanceTimingMiddleware is already collecting queries
+            return timings, None
+        timings = {"db": 0.0, "queries": []}
+        return timings, _timings.set(timings)
+
+    def finish(self, request, response, timings, duration):
+        view = getattr(request.resolver_match, "view_name", None) or "unmatched"
+        metrics.REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        metrics.REQUEST_LATENCY.observe(duration, view=view, method=request.method)
+        metrics.REQUEST_QUERIES.observe(len(timings["queries"]), view=view)
+        metrics.REQUEST_DB_TIME.observe(timings["db"], view=view)
+        metrics.maybe_flush()
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Count, IntegerField, Sum, Value, When
+from django.db.models.functions import TruncDate
+
+# Prices as of this migration (CarWashService.SERVICE_PRICE)
+SERVICE_PRICE = {
+    "full_carwash": 70,
+    "inside_vacuum": 40,
+    "only_body": 30,
+    "full_with_polish": 100,
+    "only_polish": 30,
+}
+
+
+def build_rollup(apps, schema_editor):
+    CarWashService = apps.get_model('app1', 'CarWashService')
+    DailySalesRollup = apps.get_model('app1', 'DailySalesRollup')
+    price = Case(
+        *[When(service_type=service_type, then=Value(amount)) for service_type, amount in SERVICE_PRICE.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    rows = (CarWashService.objects.annotate(day=TruncDate('service_date'))
+            .values('day', 'employee_id', 'service_type', 'status')
+            .annotate(count=Count('id'), revenue=Sum(price))
+            .order_by())
+    DailySalesRollup.objects.bulk_create((DailySalesRollup(**row) for row in rows), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0011_reviewmodel_delete_outstandingtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('service_type', models.CharField(choices=[('full_carwash', 'Full Carwash - 70 Rupees'), ('inside_vacuum', 'Inside Vacuum - 40 Rupees'), ('only_body', 'Only Body - 30 Rupees'), ('full_with_polish', 'Full with Polish - 100 Rupees'), ('only_polish', 'Only Polish - 30 Rupees')], max_length=50)),
+                ('status', models.CharField(max_length=15)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('revenue', models.PositiveIntegerField(default=0)),
+                ('employee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'employee', 'service_type', 'status'), name='unique_daily_sales_rollup', nulls_distinct=False)],
+            },
+        ),
+        migrations.RunPython(build_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0012_dailysalesrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='carwashservice',
+            index=models.Index(fields=['service_date'], name='carwash_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carwashservice',
+            index=models.Index(fields=['employee', 'service_date'], name='carwash_emp_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carwashservice',
+            index=models.Index(fields=['status', 'service_date'], name='carwash_status_date_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:17
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def build_summary(apps, schema_editor):
+    Reviewmodel = apps.get_model('app1', 'Reviewmodel')
+    ReviewSummary = apps.get_model('app1', 'ReviewSummary')
+    counts = dict(Reviewmodel.objects.values_list('ratings').annotate(n=Count('id')).order_by())
+    ReviewSummary.objects.create(pk=1, **{f'rating_{rating}': counts.get(rating, 0) for rating in range(1, 6)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0013_carwashservice_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating_1', models.PositiveIntegerField(default=0)),
+                ('rating_2', models.PositiveIntegerField(default=0)),
+                ('rating_3', models.PositiveIntegerField(default=0)),
+                ('rating_4', models.PositiveIntegerField(default=0)),
+                ('rating_5', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(build_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0014_reviewsummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='carwashservice',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['service_date', 'id'], name='carwash_pending_idx'),
+        ),
+    ]
@@ -1,7 +1,12 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import Case, Count, F, FilteredRelation, IntegerField, Q, Sum, Value, When, Window
+from django.db.models.functions import Coalesce, Rank, TruncDate, TruncDay, TruncHour, TruncMonth, TruncWeek
 from django.contrib.auth.models import BaseUserManager, AbstractBaseUser
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from .hashers import amake_password
+from .response_cache import invalidate
 
 # Admin & employee
 class AdminEmployees(BaseUserManager):  # UserManeger
@@ -18,6 +23,19 @@ class AdminEmployees(BaseUserManager):  # UserManeger
         user.save(using = self._db)
 
         return user
+
+    async def acreate_user(self, employee_name, salary, is_admin, password=None, password2=None):
+        """Async create_user that hashes the password on the hashing pool."""
+        if not employee_name:
+            raise ValueError("Employee must have an name")
+        user = self.model(
+            employee_name=employee_name,
+            salary=salary,
+            is_admin=is_admin,
+        )
+        user.password = await amake_password(password)
+        await user.asave(using=self._db)
+        return user
     
     def create_superuser(self, employee_name, salary  ,is_admin, password=None): 
         """Creates and saves a superuser with the given email, name,tc and password."""
@@ -73,6 +91,11 @@ class Customer(models.Model):
 
     def __str__(self):
         return self.email
+
+    # Customers authenticated by app1.tokens.CustomerJWTAuthentication pass IsAuthenticated
+    @property
+    def is_authenticated(self):
+        return True
     
 # Service records    
 class CarWashService(models.Model):
@@ -106,6 +129,16 @@ class CarWashService(models.Model):
                                   ], 
                                   default="pending")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["service_date"], name="carwash_date_idx"),
+            models.Index(fields=["employee", "service_date"], name="carwash_emp_date_idx"),
+            models.Index(fields=["status", "service_date"], name="carwash_status_date_idx"),
+            # Queue of unclaimed jobs for claim_next; stays as small as the backlog
+            models.Index(fields=["service_date", "id"], name="carwash_pending_idx",
+                         condition=Q(status="pending")),
+        ]
+
 
     def __str__(self):
         return f"{self.SERVICE_TYPE_CHOICES()} on {self.service_date.strftime('%Y-%m-%d %H:%M:%S')}"
@@ -115,29 +148,253 @@ class CarWashService(models.Model):
     def price(self):
         """Returns the price based on the selected service type."""
         return self.SERVICE_PRICE.get(self.service_type, 0)  # Default to 0 if no match
+
+    @classmethod
+    def price_expression(cls):
+        """SQL expression mirroring ``price`` so earnings can be summed by the database."""
+        return Case(
+            *[When(service_type=service_type, then=Value(price))
+              for service_type, price in cls.SERVICE_PRICE.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+
+    @staticmethod
+    def period_days(period):
+        """First and last day (inclusive) covered by one of the sales periods."""
+        today = timezone.localdate()
+        if period == "today":
+            return today, today
+        if period == "yesterday":
+            yesterday = today - timedelta(days=1)
+            return yesterday, yesterday
+        if period == "weekly":  # Monday to Sunday of the current week
+            start_of_week = today - timedelta(days=today.weekday())
+            return start_of_week, start_of_week + timedelta(days=6)
+        if period == "this_month":
+            first_of_next = (today.replace(day=28) + timedelta(days=4)).replace(day=1)
+            return today.replace(day=1), first_of_next - timedelta(days=1)
+        raise ValueError(f"Unsupported period '{period}'.")
+
+    @staticmethod
+    def period_range(period):
+        """Timezone-aware half-open ``[start, end)`` datetimes covering a sales period."""
+        first_day, last_day = CarWashService.period_days(period)
+        start = timezone.make_aware(datetime.combine(first_day, time.min))
+        end = timezone.make_aware(datetime.combine(last_day + timedelta(days=1), time.min))
+        return start, end
     
-    
+    @classmethod
+    def claim_next(cls, employee_id):
+        """Assign the oldest pending service to an employee and mark it in progress.
+
+        Returns the service, or None when nothing is pending. The row is locked with
+        SELECT ... FOR UPDATE SKIP LOCKED, so concurrent claims each get a different
+        job without waiting on each other.
+
+        The job is moved in the daily rollup once the claim has committed, not by
+        the save signals: every pending job of the day shares one rollup row, and
+        locking it inside the claim would make all claimers queue on it again. If
+        the process dies in between, rebuild_sales_rollup repairs the counts.
+        """
+        with transaction.atomic():
+            service = (cls.objects.select_for_update(skip_locked=True)
+                       .filter(status="pending").order_by("service_date", "id").first())
+            if service is None:
+                return None
+            old_key = DailySalesRollup.key_for(service)
+            service.employee_id = employee_id
+            service.status = "in_progress"
+            cls.objects.filter(pk=service.pk).update(employee_id=employee_id, status="in_progress")
+            new_key = DailySalesRollup.key_for(service)
+
+            def move_in_rollup():
+                with transaction.atomic():
+                    DailySalesRollup.apply(old_key, -1, -service.price)
+                    DailySalesRollup.apply(new_key, 1, service.price)
+
+            transaction.on_commit(move_in_rollup)
+            invalidate("services")  # Also after the commit
+        return service
+
+    def save(self, *args, **kwargs):
+        # The rollup signals write in the same transaction as the service row
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
     # Making a static method in service for sales count
     @staticmethod
     def count_services_by_period(period):
-        """Count services based on the period selected by the user."""
-        today = timezone.now().date()
-        # Filter by the user's period selection
-        if period == "today":  #C ount of current day
-            count = CarWashService.objects.filter(service_date__date=today)
-        elif period == "yesterday":  #C ount of previous day
-            yesterday = today - timedelta(days=1)
-            count = CarWashService.objects.filter(service_date__date=yesterday)
-        elif period == "weekly":  #C ount of weekly sales
-            # Get the start of the current week (Monday) and end of the current week (Sunday)
-            start_of_week = today - timedelta(days=today.weekday())  # Monday
-            end_of_week = start_of_week + timedelta(days=6)  # Sunday
-            count = CarWashService.objects.filter(service_date__gte=start_of_week, service_date__lte=end_of_week)
-        elif period == "this_month":  # Count of monthly sales
-            count = CarWashService.objects.filter(service_date__month=today.month, service_date__year=today.year)
+        """Services in the period selected by the user ("today", "yesterday", "weekly", "this_month").
+
+        Filters on a plain ``service_date`` range so the index on that column can be used.
+        """
+        start, end = CarWashService.period_range(period)
+        return CarWashService.objects.filter(service_date__gte=start, service_date__lt=end)
+
+
+# Pre-aggregated sales, one row per day, employee, service type and status
+class DailySalesRollup(models.Model):
+    day = models.DateField()
+    employee = models.ForeignKey(EmployeesModel, null=True, blank=True, on_delete=models.CASCADE,
+                                 related_name="sales_rollups")
+    service_type = models.CharField(max_length=50, choices=CarWashService.SERVICE_TYPE_CHOICES)
+    status = models.CharField(max_length=15)
+    count = models.PositiveIntegerField(default=0)
+    revenue = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # NULLS NOT DISTINCT so unassigned services share one row per key; needs
+            # PostgreSQL 15+ (app1.checks refuses older servers, where Django would
+            # silently drop the option and apply() could create duplicate rows)
+            models.UniqueConstraint(
+                fields=["day", "employee", "service_type", "status"],
+                name="unique_daily_sales_rollup",
+                nulls_distinct=False,
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.service_type} x{self.count}"
+
+    @staticmethod
+    def key_for(service):
+        """Rollup row a service is counted in."""
+        return (timezone.localdate(service.service_date), service.employee_id,
+                service.service_type, service.status)
+
+    @classmethod
+    def apply(cls, key, count, revenue):
+        """Add ``count`` and ``revenue`` (negative to subtract) to the row for ``key``."""
+        day, employee_id, service_type, status = key
+        lookup = dict(day=day, employee_id=employee_id, service_type=service_type, status=status)
+        changes = dict(count=F("count") + count, revenue=F("revenue") + revenue)
+        if cls.objects.filter(**lookup).update(**changes) or count <= 0:
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(count=count, revenue=revenue, **lookup)
+        except IntegrityError:  # Another request created the row first
+            cls.objects.filter(**lookup).update(**changes)
+
+    @classmethod
+    def record_services(cls, services, sign=1):
+        """Count (or with ``sign=-1`` uncount) a batch of services, one update per row."""
+        deltas = {}
+        for service in services:
+            key = cls.key_for(service)
+            count, revenue = deltas.get(key, (0, 0))
+            deltas[key] = (count + 1, revenue + service.price)
+        for key, (count, revenue) in deltas.items():
+            cls.apply(key, sign * count, sign * revenue)
+
+    @classmethod
+    def totals(cls, start_day, end_day):
+        """Service count and earnings between two days (inclusive)."""
+        return cls.objects.filter(day__gte=start_day, day__lte=end_day).aggregate(
+            count=Coalesce(Sum("count"), 0),
+            total_earnings=Coalesce(Sum("revenue"), 0),
+        )
+
+    @classmethod
+    def leaderboard(cls, start_day, end_day, status=None):
+        """Active employees ranked by revenue between two days (inclusive), with their
+        service count; one grouped query, employees without services rank last."""
+        rows = Q(sales_rollups__day__gte=start_day, sales_rollups__day__lte=end_day)
+        if status:
+            rows &= Q(sales_rollups__status=status)
+        # The period goes in the JOIN condition, so only its rollup rows are read
+        return (EmployeesModel.objects.filter(is_active=True)
+                .annotate(period=FilteredRelation("sales_rollups", condition=rows))
+                .values("id", "employee_name")
+                .annotate(
+                    count=Coalesce(Sum("period__count"), 0),
+                    revenue=Coalesce(Sum("period__revenue"), 0),
+                )
+                .annotate(rank=Window(Rank(), order_by=F("revenue").desc()))
+                .order_by("rank", "employee_name"))
+
+    SERIES_INTERVALS = ("hour", "day", "week", "month")
+
+    @classmethod
+    def series(cls, interval, start_day, end_day, employee_id=None, status=None):
+        """Service count and revenue per ``interval`` between two days (inclusive),
+        as ``{bucket start: (count, revenue)}`` holding only the non-empty buckets.
+
+        Days, weeks and months are summed from the rollup; hours are finer than the
+        rollup, so they are counted from the services table.
+        """
+        filters = {}
+        if employee_id is not None:
+            filters["employee_id"] = employee_id
+        if status:
+            filters["status"] = status
+        if interval == "hour":
+            start = timezone.make_aware(datetime.combine(start_day, time.min))
+            end = timezone.make_aware(datetime.combine(end_day + timedelta(days=1), time.min))
+            rows = (CarWashService.objects.filter(service_date__gte=start, service_date__lt=end, **filters)
+                    .annotate(bucket=TruncHour("service_date"))
+                    .values("bucket")
+                    .annotate(count=Count("id"), revenue=Sum(CarWashService.price_expression())))
+        else:
+            trunc = {"day": TruncDay, "week": TruncWeek, "month": TruncMonth}[interval]
+            rows = (cls.objects.filter(day__gte=start_day, day__lte=end_day, **filters)
+                    .annotate(bucket=trunc("day"))
+                    .values("bucket")
+                    .annotate(count=Sum("count"), revenue=Sum("revenue")))
+        return {row["bucket"]: (row["count"], row["revenue"]) for row in rows.order_by()}
+
+    @staticmethod
+    def series_buckets(interval, start_day, end_day):
+        """Start of every ``interval`` bucket between two days (inclusive), matching
+        the keys ``series`` returns."""
+        if interval == "hour":
+            # Step in UTC: hour arithmetic on aware local times is wall-clock arithmetic,
+            # which skips or repeats a bucket on DST transition days.
+            bucket = timezone.make_aware(datetime.combine(start_day, time.min)).astimezone(dt_timezone.utc)
+            end = timezone.make_aware(datetime.combine(end_day + timedelta(days=1), time.min))
+            while bucket < end:
+                yield timezone.localtime(bucket)
+                bucket += timedelta(hours=1)
+            return
+        if interval == "week":
+            bucket = start_day - timedelta(days=start_day.weekday())
+        elif interval == "month":
+            bucket = start_day.replace(day=1)
         else:
-            count = 0 
-        return count
+            bucket = start_day
+        while bucket <= end_day:
+            yield bucket
+            if interval == "day":
+                bucket += timedelta(days=1)
+            elif interval == "week":
+                bucket += timedelta(weeks=1)
+            else:
+                bucket = (bucket.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+    @classmethod
+    def rebuild(cls, start_day=None, end_day=None):
+        """Recompute rollup rows from the services table, optionally for a range of days.
+
+        Cached responses built from the rollup are invalidated once the new rows commit.
+        """
+        rows = CarWashService.objects.annotate(day=TruncDate("service_date"))
+        stale = cls.objects.all()
+        if start_day:
+            rows = rows.filter(day__gte=start_day)
+            stale = stale.filter(day__gte=start_day)
+        if end_day:
+            rows = rows.filter(day__lte=end_day)
+            stale = stale.filter(day__lte=end_day)
+        rows = (rows.values("day", "employee_id", "service_type", "status")
+                .annotate(count=Count("id"), revenue=Sum(CarWashService.price_expression()))
+                .order_by())
+        with transaction.atomic():
+            stale.delete()
+            created = cls.objects.bulk_create((cls(**row) for row in rows), batch_size=1000)
+            invalidate("services")  # Leaderboard and sales series responses read the rollup
+        return len(created)
 
 
 class Reviewmodel(models.Model):
@@ -154,4 +411,57 @@ class Reviewmodel(models.Model):
     review = models.CharField(max_length=500,blank=False)
 
     def __str__(self):
-        return f"{self.ratings()}"
\ No newline at end of file
+        return f"{self.ratings()}"
+
+# Running rating counts behind the review summary, kept in a single row
+class ReviewSummary(models.Model):
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+
+    SUMMARY_ID = 1
+
+    def __str__(self):
+        return f"{self.count} reviews"
+
+    @classmethod
+    def record(cls, rating, count=1):
+        """Add ``count`` reviews (negative to remove) with the given rating."""
+        field = f"rating_{rating}"
+        if cls.objects.filter(pk=cls.SUMMARY_ID).update(**{field: F(field) + count}) or count <= 0:
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(pk=cls.SUMMARY_ID, **{field: count})
+        except IntegrityError:  # Another request created the row first
+            cls.objects.filter(pk=cls.SUMMARY_ID).update(**{field: F(field) + count})
+
+    @classmethod
+    def current(cls):
+        return cls.objects.filter(pk=cls.SUMMARY_ID).first() or cls(pk=cls.SUMMARY_ID)
+
+    @property
+    def histogram(self):
+        return {str(rating): getattr(self, f"rating_{rating}") for rating, _ in Reviewmodel.RATINGS_CHOICES}
+
+    @property
+    def count(self):
+        return sum(self.histogram.values())
+
+    @property
+    def average(self):
+        count = self.count
+        if not count:
+            return None
+        return round(sum(int(rating) * n for rating, n in self.histogram.items()) / count, 2)
+
+    @classmethod
+    def rebuild(cls):
+        """Recount every rating from the reviews table."""
+        counts = dict(Reviewmodel.objects.values_list("ratings").annotate(n=Count("id")).order_by())
+        with transaction.atomic():
+            cls.objects.update_or_create(pk=cls.SUMMARY_ID, defaults={
+                f"rating_{rating}": counts.get(rating, 0) for rating, _ in Reviewmodel.RATINGS_CHOICES
+            })
@@ -0,0 +1,15 @@
+from rest_framework.permissions import BasePermission
+
+
+class IsAdminEmployee(BasePermission):
+    """Allows access only to admin employees.
+
+    Reads ``request.user.is_admin``, which is the model field with the default
+    JWTAuthentication and the token's ``is_admin`` claim with the stateless mode
+    (settings.JWT_STATELESS_AUTH), so no user query is needed there.
+    """
+    message = "Permission denied.(You are not admin)"
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated
+                    and getattr(request.user, "is_admin", False))
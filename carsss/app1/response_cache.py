@@ -0,0 +1,123 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from rest_framework.response import Response
+
+# Rendered GET responses cached per endpoint, user, negotiated media type and
+# query string. Every key also embeds the current "generation" of the data groups
+# the endpoint reads; model signals bump a group's generation on any write, which
+# orphans its old entries (they age out of the cache on their own).
+#
+# The generations are kept in their own cache ("response_generations"), out of
+# reach of the culling of "responses": a lost counter would start again and
+# revive entries of an earlier generation. A counter that is missing anyway
+# starts from the clock, so it cannot repeat an earlier value either.
+
+def _generation_key(group):
+    return f"generation:{group}"
+
+
+def _bump(groups):
+    cache = caches["response_generations"]
+    for group in groups:
+        try:
+            cache.incr(_generation_key(group))
+        except ValueError:  # No generation yet (or lost)
+            cache.set(_generation_key(group), time.time_ns(), None)
+
+
+def invalidate(*groups):
+    """Make every cached response built from ``groups`` stale, once the current
+    transaction commits (right away outside one).
+
+    Bumping earlier would let a request that reads the new generation cache the
+    data from before the commit.
+    """
+    transaction.on_commit(lambda: _bump(groups))
+
+
+def _cache_key(view, request, media_type, groups, generations):
+    """Key for a response; ``generations`` is what the cache holds for the groups' generation keys."""
+    generation = ".".join(str(generations.get(_generation_key(group), 0)) for group in groups)
+    query = hashlib.md5(request.GET.urlencode().encode()).hexdigest()
+    # The module keeps the sync and async views of one endpoint apart
+    view_name = f"{type(view).__module__}.{type(view).__name__}"
+    return ":".join([view_name, str(request.user.pk), media_type, generation, query])
+
+
+def _etag_matches(request, etag):
+    return etag in parse_etags(request.headers.get("If-None-Match", ""))
+
+
+def _finish(response, etag):
+    response["ETag"] = etag
+    patch_cache_control(response, private=True, no_cache=True)  # Revalidate with If-None-Match
+    return response
+
+
+def _replay(request, entry):
+    etag, content, content_type = entry
+    if _etag_matches(request, etag):
+        return _finish(HttpResponseNotModified(), etag)
+    return _finish(HttpResponse(content, content_type=content_type), etag)
+
+
+def cached_response(*groups):
+    """Cache the rendered 200 responses of an APIView GET handler.
+
+    A client sending a matching ``If-None-Match`` gets a 304 without the data being
+    serialized or even read from the database.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            cache = caches["responses"]
+            generations = caches["response_generations"].get_many([_generation_key(group) for group in groups])
+            key = _cache_key(view, request, request.accepted_media_type, groups, generations)
+            entry = cache.get(key)
+            if entry is not None:
+                return _replay(request, entry)
+
+            response = method(view, request, *args, **kwargs)
+            if not isinstance(response, Response) or response.status_code != 200:
+                return response  # Errors and streamed exports are not cached
+            response = view.finalize_response(request, response, *args, **kwargs)
+            response.render()
+            etag = quote_etag(hashlib.md5(response.content).hexdigest())
+            cache.set(key, (etag, response.content, response["Content-Type"]))
+            if _etag_matches(request, etag):
+                return _finish(HttpResponseNotModified(), etag)
+            return _finish(response, etag)
+        return wrapper
+    return decorator
+
+
+def acached_response(*groups):
+    """``cached_response`` for the async views (app1/async_views.py), which return
+    JSON ``HttpResponse`` objects that are already rendered."""
+    def decorator(method):
+        @wraps(method)
+        async def wrapper(view, request, *args, **kwargs):
+            cache = caches["responses"]
+            generations = await caches["response_generations"].aget_many(
+                [_generation_key(group) for group in groups])
+            key = _cache_key(view, request, "application/json", groups, generations)
+            entry = await cache.aget(key)
+            if entry is not None:
+                return _replay(request, entry)
+
+            response = await method(view, request, *args, **kwargs)
+            if response.status_code != 200 or response.streaming:
+                return response
+            entry = (quote_etag(hashlib.md5(response.content).hexdigest()), response.content,
+                     response["Content-Type"])
+            await cache.aset(key, entry)
+            return _replay(request, entry)
+        return wrapper
+    return decorator
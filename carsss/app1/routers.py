@@ -0,0 +1,79 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Routing state of the code running now (one per request thread or async task).
+# A dict so that code run through sync_to_async, which works on a copy of the
+# context, still records its writes in the same state.
+_routing = ContextVar("replica_routing", default=None)
+
+
+@contextmanager
+def replica_reads():
+    """Send the reads made inside the block to the replica (settings.DATABASE_REPLICA_ALIAS).
+
+    Once anything inside the block writes, the rest of its reads go back to the
+    primary, so the request sees its own writes.
+    """
+    state = _routing.get()
+    if state is not None:  # Nested; keep the outer state and its writes
+        previous = state["replica"]
+        state["replica"] = True
+        try:
+            yield
+        finally:
+            state["replica"] = previous
+        return
+    token = _routing.set({"replica": True, "wrote": False})
+    try:
+        yield
+    finally:
+        _routing.reset(token)
+
+
+def use_replica(method):
+    """Run a view handler (sync or async) inside ``replica_reads()``."""
+    if iscoroutinefunction(method):
+        @wraps(method)
+        async def async_wrapper(*args, **kwargs):
+            with replica_reads():
+                return await method(*args, **kwargs)
+        return async_wrapper
+
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return method(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Reads opted in with ``replica_reads``/``use_replica`` go to the replica,
+    everything else, and every write, to the primary."""
+
+    def db_for_read(self, model, **hints):
+        replica = settings.DATABASE_REPLICA_ALIAS
+        state = _routing.get()
+        if not replica or state is None or not state["replica"] or state["wrote"]:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:  # Reads in a write transaction
+            return None
+        return replica
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state["wrote"] = True  # Read-your-writes for the rest of the request
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # The replica holds the same rows as the primary
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == settings.DATABASE_REPLICA_ALIAS:
+            return False  # Schema arrives through replication
+        return None
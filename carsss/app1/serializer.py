@@ -1,19 +1,78 @@
-from rest_framework import serializers
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from rest_framework.utils.field_mapping import get_unique_error_message
 from .models import EmployeesModel,Customer,CarWashService,Reviewmodel
 from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, connection, transaction
+from contextlib import contextmanager, nullcontext
 import re
 
+
+# Unique fields are checked by the database constraint on INSERT/UPDATE instead of
+# a query beforehand; this is the error UniqueValidator would have raised
+def unique_violation(model, field_name):
+    message = get_unique_error_message(model._meta.get_field(field_name))
+    return serializers.ValidationError({field_name: [message]})
+
+
+@contextmanager
+def unique_constraint(model, field_name):
+    """Raise ``unique_violation`` when the write in the block breaks the unique constraint.
+
+    In autocommit mode a failed statement needs no cleanup, so a savepoint (and its
+    extra round trips) is only used inside a transaction, to keep it usable.
+    """
+    try:
+        with transaction.atomic() if connection.in_atomic_block else nullcontext():
+            yield
+    except IntegrityError:
+        raise unique_violation(model, field_name)
+
+def datetime_representation(field):
+    """``field.to_representation`` for a DateTimeField, with the common case (an aware
+    datetime in the default ISO 8601 format) done inline for the fast list paths."""
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def to_representation(value):
+        if value is None or value.tzinfo is None:
+            return field.to_representation(value)
+        try:
+            value = value.astimezone(field_timezone).isoformat()
+        except OverflowError:
+            return field.to_representation(value)
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+    return to_representation
+
+
 # Admin and Employee
 class EmployeeSerializer(serializers.ModelSerializer):
     password2 = serializers.CharField(style={"input_type":"password"},write_only=True)
     class Meta:
         model = EmployeesModel
         fields = ["id", "employee_name", "salary","is_admin","password","password2"]
+        extra_kwargs = {"employee_name": {"validators": []}}  # Uniqueness is left to the INSERT
+
+    # Read-only fast path for the list view: values() rows turned into the same
+    # dicts as ``.data``, without model instances or a field-by-field walk per row
+    @staticmethod
+    def project(queryset):
+        return queryset.values("id", "employee_name", "salary", "is_admin", "password")
+
+    @classmethod
+    def represent(cls, rows):
+        salary = cls().fields["salary"].to_representation
+        return [
+            {"id": row["id"], "employee_name": row["employee_name"], "salary": salary(row["salary"]),
+             "is_admin": row["is_admin"], "password": row["password"]}
+            for row in rows
+        ]
 
     # Validating empname
     def validate_employee_name(self, value):  # Using validation on empNAME
-        if EmployeesModel.objects.filter(employee_name=value).exists() :
-            raise serializers.ValidationError("Employee with this name is already there ") 
         if not value[0].isalpha():
             raise serializers.ValidationError("Employee name must start with a letter.")
         if not re.match(r'^[A-Za-z][A-Za-z0-9@]*$', value):
@@ -33,7 +92,8 @@ class EmployeeSerializer(serializers.ModelSerializer):
     
     # Took password2 so need to do method create  
     def create(self,validate_data):
-        return EmployeesModel.objects.create_user(**validate_data)
+        with unique_constraint(EmployeesModel, "employee_name"):
+            return EmployeesModel.objects.create_user(**validate_data)
 
 # Emp loginSerializer
 class EmployeeLoginSerializer(serializers.ModelSerializer):
@@ -57,6 +117,7 @@ class CustomerRegisterSerializer(serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = ["email", "first_name", "last_name", "password", "password_confirm"]
+        extra_kwargs = {"email": {"validators": []}}  # Uniqueness is left to the INSERT
 
     # Ensure passwords match
     def validate(self, data):
@@ -65,13 +126,29 @@ class CustomerRegisterSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Passwords must match.")
         return data
 
+    # Stored with the hashed password in a single INSERT
     def create(self, validated_data):
         validated_data.pop("password_confirm", None)
-        password = validated_data.pop("password")
-        customer = Customer.objects.create(**validated_data)
-        customer.password = make_password(password)  # set the hashed password
-        customer.save()
-        return customer
+        validated_data["password"] = make_password(validated_data["password"])
+        with unique_constraint(Customer, "email"):
+            return Customer.objects.create(**validated_data)
+
+    def update(self, instance, validated_data):
+        validated_data.pop("password_confirm", None)
+        validated_data["password"] = make_password(validated_data["password"])
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        with unique_constraint(Customer, "email"):
+            instance.save()
+        return instance
+
+# One row of a bulk customer import (app1/importers.py); duplicate emails are
+# resolved by the bulk INSERT, not checked here
+class CustomerImportSerializer(serializers.Serializer):
+    email = serializers.EmailField(max_length=254)
+    first_name = serializers.CharField(max_length=100)
+    last_name = serializers.CharField(max_length=100)
+    password = serializers.CharField()
 
 # Customer Login Serializer
 class CustomerLoginSerializer(serializers.Serializer):
@@ -84,10 +161,25 @@ class CustomerSerilizer(serializers.ModelSerializer):
         model = Customer
         fields=["id", "email", "first_name", "last_name", "is_active"]
 
+    # Read-only fast path for the list view, as EmployeeSerializer.project
+    @staticmethod
+    def project(queryset):
+        return queryset.values("id", "email", "first_name", "last_name", "is_active")
+
+    @staticmethod
+    def represent(rows):
+        return [
+            {"id": row["id"], "email": row["email"], "first_name": row["first_name"],
+             "last_name": row["last_name"], "is_active": row["is_active"]}
+            for row in rows
+        ]
+
 
 # Serializer for records of serives
 class CarWashServiceSerializer(serializers.ModelSerializer):
-    employee = serializers.PrimaryKeyRelatedField(queryset=EmployeesModel.objects.all())
+    # Left empty for pending jobs; set when an employee claims one
+    employee = serializers.PrimaryKeyRelatedField(queryset=EmployeesModel.objects.all(), allow_null=True,
+                                                  required=False)
     customer = serializers.PrimaryKeyRelatedField(queryset=Customer.objects.all())
     status = serializers.ChoiceField(choices=[
                                         ("pending", "Pending"), 
@@ -98,6 +190,29 @@ class CarWashServiceSerializer(serializers.ModelSerializer):
         model = CarWashService
         fields = ["id", "service_type", "employee", "customer", "status", "price", "service_date"]
 
+    # employee/customer render as ids straight from the foreign key columns,
+    # so no select_related join is needed; only() keeps the row narrow
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.only("id", "service_type", "employee", "customer", "status", "service_date")
+
+    # Read-only fast path for list responses, as EmployeeSerializer.project; price
+    # is looked up in SERVICE_PRICE like the model property does
+    @staticmethod
+    def project(queryset):
+        return queryset.values("id", "service_type", "employee", "customer", "status", "service_date")
+
+    @classmethod
+    def represent(cls, rows):
+        prices = CarWashService.SERVICE_PRICE
+        service_date = datetime_representation(cls().fields["service_date"])
+        return [
+            {"id": row["id"], "service_type": row["service_type"], "employee": row["employee"],
+             "customer": row["customer"], "status": row["status"],
+             "price": prices.get(row["service_type"], 0), "service_date": service_date(row["service_date"])}
+            for row in rows
+        ]
+
     # Check if the employee exists in the database
     def validate_employee(self, value):
         return value
@@ -107,6 +222,19 @@ class CarWashServiceSerializer(serializers.ModelSerializer):
         return value
 
 
+# Serializer for one record of a bulk upload; employee and customer ids are
+# checked for the whole batch at once by CarWashServiceView
+class CarWashServiceBulkSerializer(serializers.Serializer):
+    service_type = serializers.ChoiceField(choices=CarWashService.SERVICE_TYPE_CHOICES, default="full_carwash")
+    employee = serializers.IntegerField(allow_null=True, required=False)  # Unassigned jobs wait to be claimed
+    customer = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=[
+                                        ("pending", "Pending"), 
+                                        ("completed", "Completed"), 
+                                        ("in_progress", "In Progress"),
+                                        ])
+
+
 class ReviewSerializer(serializers.ModelSerializer):
     class Meta:
         model=Reviewmodel
@@ -0,0 +1,93 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import EmployeesModel, Customer, CarWashService, DailySalesRollup, Reviewmodel, ReviewSummary
+from .response_cache import invalidate
+
+# Fields that decide which rollup row a service is counted in
+ROLLUP_FIELDS = ("service_date", "employee_id", "service_type", "status")
+
+
+# Remember the rollup row of a service before it is changed
+@receiver(pre_save, sender=CarWashService)
+def remember_rollup_key(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._rollup_key = None
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not {"service_date", "employee", "employee_id",
+                                          "service_type", "status"} & set(update_fields):
+        return
+    previous = sender.objects.filter(pk=instance.pk).only(*ROLLUP_FIELDS).first()
+    if previous is not None:
+        instance._rollup_key = (DailySalesRollup.key_for(previous), previous.price)
+
+
+# Keep the daily rollup in step with created and edited services
+@receiver(post_save, sender=CarWashService)
+def update_rollup_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        DailySalesRollup.record_services([instance])
+        return
+    previous = getattr(instance, "_rollup_key", None)
+    if previous is None:
+        return
+    old_key, old_price = previous
+    new_key = DailySalesRollup.key_for(instance)
+    if (old_key, old_price) != (new_key, instance.price):
+        DailySalesRollup.apply(old_key, -1, -old_price)
+        DailySalesRollup.apply(new_key, 1, instance.price)
+
+
+@receiver(post_delete, sender=CarWashService)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    DailySalesRollup.record_services([instance], sign=-1)
+
+
+# Cached list responses (app1/response_cache.py) go stale on any write
+@receiver(post_save, sender=CarWashService)
+@receiver(post_delete, sender=CarWashService)
+def invalidate_service_responses(sender, **kwargs):
+    invalidate("services")
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def invalidate_customer_responses(sender, **kwargs):
+    invalidate("customers")
+
+
+@receiver(post_save, sender=EmployeesModel)
+@receiver(post_delete, sender=EmployeesModel)
+def invalidate_employee_responses(sender, **kwargs):
+    invalidate("employees")
+
+
+# Remember the rating of a review before it is changed
+@receiver(pre_save, sender=Reviewmodel)
+def remember_rating(sender, instance, raw=False, **kwargs):
+    instance._previous_rating = None
+    if raw or instance._state.adding:
+        return
+    instance._previous_rating = sender.objects.filter(pk=instance.pk).values_list("ratings", flat=True).first()
+
+
+# Keep the rating summary in step with created, edited and deleted reviews
+@receiver(post_save, sender=Reviewmodel)
+def update_summary_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_previous_rating", None)
+    if not created and previous in (None, instance.ratings):
+        return
+    if previous is not None:
+        ReviewSummary.record(previous, -1)
+    ReviewSummary.record(instance.ratings)
+    invalidate("reviews")
+
+
+@receiver(post_delete, sender=Reviewmodel)
+def update_summary_on_delete(sender, instance, **kwargs):
+    ReviewSummary.record(instance.ratings, -1)
+    invalidate("reviews")
@@ -1,3 +1,1248 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, router
+from django.db.models import Count, Q, Sum
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import async_views, metrics, tokens
+from .models import EmployeesModel, Customer, CarWashService, DailySalesRollup, Reviewmodel
+from .response_cache import invalidate
+from .importers import import_customers, read_rows
+from .renderers import FastJSONRenderer
+from .routers import replica_reads
+from .serializer import CarWashServiceSerializer, CustomerSerilizer, EmployeeSerializer
+from .views import SocialLinks, get_refresh_token_for_customer, get_tokens_for_user
+
+
+class ServicePeriodIndexTests(TestCase):
+    """Period filters must stay sargable so Postgres can use the service_date indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = EmployeesModel.objects.create_user("washer1", 1000, False, "pass1234")
+        cls.customer = Customer.objects.create(
+            email="cust@example.com", first_name="Cust", last_name="Omer", password="x")
+        CarWashService.objects.bulk_create(
+            CarWashService(employee=cls.employee, customer=cls.customer) for _ in range(20))
+
+    def explain(self, queryset):
+        if connection.vendor == "postgresql":
+            # Tiny test tables would otherwise always be sequentially scanned
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def test_period_filter_is_a_half_open_range(self):
+        start, end = CarWashService.period_range("weekly")
+        self.assertEqual((end - start).days, 7)
+        sql = str(CarWashService.count_services_by_period("weekly").query)
+        self.assertNotIn("EXTRACT", sql.upper())
+        self.assertNotIn("::DATE", sql.upper())
+        self.assertNotIn("DJANGO_DATETIME_CAST_DATE", sql.upper())
+
+    def test_period_filter_uses_service_date_index(self):
+        for period in ("today", "yesterday", "weekly", "this_month"):
+            with self.subTest(period=period):
+                plan = self.explain(CarWashService.count_services_by_period(period))
+                self.assertIn("carwash_date_idx", plan)
+
+    def test_employee_period_filter_uses_composite_index(self):
+        services = CarWashService.count_services_by_period("this_month").filter(employee=self.employee)
+        self.assertIn("carwash_emp_date_idx", self.explain(services))
+
+    def test_unknown_period_is_rejected(self):
+        with self.assertRaises(ValueError):
+            CarWashService.count_services_by_period("fortnight")
+
+
+class ServicesCountTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = EmployeesModel.objects.create_user("admin1", 5000, True, "pass1234")
+        customer = Customer.objects.create(email="c@example.com", first_name="C", last_name="X")
+        for service_type in ("full_carwash", "full_with_polish", "only_body"):
+            CarWashService.objects.create(employee=cls.admin, customer=customer, service_type=service_type)
+        old = CarWashService.objects.create(employee=cls.admin, customer=customer, service_type="inside_vacuum")
+        old.service_date -= timedelta(days=1)
+        old.save()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_count_and_earnings_per_period(self):
+        response = self.client.post(reverse("servicesCount"), {"period": "today"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data["count"], response.data["total_earnings"]), (3, 200))
+        self.assertEqual(len(response.data["services"]), 3)
+        response = self.client.post(reverse("servicesCount"), {"period": "yesterday"}, format="json")
+        self.assertEqual((response.data["count"], response.data["total_earnings"]), (1, 40))
+        self.assertEqual([row["service_type"] for row in response.data["services"]], ["inside_vacuum"])
+
+    def test_totals_match_the_services_table(self):
+        start, end = CarWashService.period_range("weekly")
+        expected = CarWashService.objects.filter(service_date__gte=start, service_date__lt=end).aggregate(
+            count=Count("id"), total_earnings=Sum(CarWashService.price_expression()))
+        response = self.client.post(reverse("servicesCount"), {"period": "weekly"}, format="json")
+        self.assertEqual((response.data["count"], response.data["total_earnings"]),
+                         (expected["count"], expected["total_earnings"]))
+
+    def test_unknown_period_is_rejected(self):
+        response = self.client.post(reverse("servicesCount"), {"period": "decade"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_admin_only(self):
+        self.client.force_authenticate(EmployeesModel.objects.create_user("emp1", 100, False, "pass1234"))
+        response = self.client.post(reverse("servicesCount"), {"period": "today"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ServicePaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = EmployeesModel.objects.create_user("admin1", 5000, True, "pass1234")
+        customer = Customer.objects.create(email="c@example.com", first_name="C", last_name="X")
+        cls.ids = [CarWashService.objects.create(employee=cls.admin, customer=customer).id for _ in range(5)]
+        cls.ids.reverse()  # Newest first
+
+    def setUp(self):
+        caches["responses"].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_cursor_pages_cover_every_service_once(self):
+        url, seen, pages = reverse("carWashService") + "?page_size=2", [], []
+        while url:
+            body = self.client.get(url).json()
+            pages.append(body)
+            seen += [row["id"] for row in body["results"]]
+            url = body["next"]
+        self.assertEqual(seen, self.ids)
+        self.assertEqual([len(page["results"]) for page in pages], [2, 2, 1])
+        self.assertIsNone(pages[0]["previous"])
+        self.assertIsNotNone(pages[1]["previous"])
+        self.assertNotIn("count", pages[0])  # No COUNT(*) with cursors
+
+    def test_services_sharing_a_date_are_paged_without_offset(self):
+        CarWashService.objects.filter(pk__in=self.ids).update(service_date=timezone.now() - timedelta(days=1))
+        url, pages, queries = reverse("carWashService") + "?page_size=2", [], []
+        while url:
+            with CaptureQueriesContext(connection) as captured:
+                body = self.client.get(url).json()
+            queries += [query["sql"] for query in captured.captured_queries]
+            pages.append([row["id"] for row in body["results"]])
+            url, previous = body["next"], body["previous"]
+        self.assertEqual(pages, [self.ids[0:2], self.ids[2:4], self.ids[4:]])
+        self.assertFalse([sql for sql in queries if "OFFSET" in sql])
+
+        back = []
+        while previous:
+            body = self.client.get(previous).json()
+            back.append([row["id"] for row in body["results"]])
+            previous = body["previous"]
+        self.assertEqual(back, [self.ids[2:4], self.ids[0:2]])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("carWashService"), {"cursor": "cD0yMDI2LTAxLTAx"})  # p=2026-01-01
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def read_stream(self, response):
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        return [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+
+    def test_stream_returns_every_service_as_ndjson(self):
+        rows = self.read_stream(self.client.get(reverse("carWashService") + "?stream=true"))
+        self.assertEqual([row["id"] for row in rows], self.ids)
+        self.assertEqual(rows[0]["price"], 70)
+
+    def test_services_count_stream_starts_with_totals(self):
+        rows = self.read_stream(self.client.post(reverse("servicesCount") + "?stream=true",
+                                                 {"period": "today"}, format="json"))
+        self.assertEqual(rows[0], {"count": 5, "total_earnings": 350})
+        self.assertEqual([row["id"] for row in rows[1:]], self.ids)
+
+
+class ServiceBatchUploadTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = EmployeesModel.objects.create_user("admin1", 5000, True, "pass1234")
+        cls.washers = [EmployeesModel.objects.create_user(f"emp{i}", 100, False, "pass1234") for i in range(2)]
+        cls.customers = [Customer.objects.create(email=f"c{i}@example.com", first_name="C", last_name="X")
+                         for i in range(3)]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def item(self, **fields):
+        return {"employee": self.washers[0].pk, "customer": self.customers[0].pk, "status": "completed", **fields}
+
+    def test_creates_the_batch_with_one_lookup_per_table(self):
+        batch = [self.item(employee=washer.pk, customer=customer.pk)
+                 for washer in self.washers for customer in self.customers]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("carWashService"), batch, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data["ids"]), 6)
+        self.assertEqual(CarWashService.objects.filter(status="completed").count(), 6)
+        for table in (EmployeesModel._meta.db_table, Customer._meta.db_table):
+            lookups = [query["sql"] for query in queries.captured_queries
+                       if query["sql"].startswith("SELECT") and f'FROM "{table}"' in query["sql"]]
+            self.assertEqual(len(lookups), 1, lookups)
+            self.assertIn(" IN (", lookups[0])
+
+    def test_errors_are_keyed_by_item_index(self):
+        batch = [self.item(), self.item(status="lost"), self.item(), self.item(employee=0, customer=0)]
+        response = self.client.post(reverse("carWashService"), batch, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.json()), {"1"})
+        self.assertIn("status", response.json()["1"])
+        batch[1] = self.item()
+        response = self.client.post(reverse("carWashService"), batch, format="json")
+        self.assertEqual(response.json(), {"3": {
+            "employee": ['Invalid pk "0" - object does not exist.'],
+            "customer": ['Invalid pk "0" - object does not exist.']}})
+
+    def test_nothing_is_saved_when_an_item_fails(self):
+        batch = [self.item() for _ in range(5)] + [self.item(customer=0)]
+        response = self.client.post(reverse("carWashService"), batch, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(CarWashService.objects.exists())
+        self.assertFalse(DailySalesRollup.objects.exists())
+
+    def test_rejects_empty_and_oversized_batches(self):
+        response = self.client.post(reverse("carWashService"), [], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with mock.patch("app1.views.CarWashServiceView.BULK_MAX_ITEMS", 2):
+            response = self.client.post(reverse("carWashService"), [self.item()] * 3, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(CarWashService.objects.exists())
+
+
+class ListQueryCountTests(TestCase):
+    """List endpoints must run the same number of queries whatever the number of rows."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = EmployeesModel.objects.create_user("admin1", 5000, True, "pass1234")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def add_rows(self, count):
+        start = Customer.objects.count()
+        customers = Customer.objects.bulk_create(
+            Customer(email=f"c{start + i}@example.com", first_name="C", last_name="X", password="x")
+            for i in range(count))
+        employees = EmployeesModel.objects.bulk_create(
+            EmployeesModel(employee_name=f"emp{start + i}", salary=100) for i in range(count))
+        CarWashService.objects.bulk_create(
+            CarWashService(employee=employee, customer=customer)
+            for employee, customer in zip(employees, customers))
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate("services", "customers", "employees")  # bulk_create skips the signals
+
+    def request(self, method, url, data=None):
+        response = getattr(self.client, method)(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response
+
+    def assert_constant_queries(self, method, url, data=None):
+        self.add_rows(2)
+        with CaptureQueriesContext(connection) as baseline:
+            self.request(method, url, data)
+        self.add_rows(8)
+        with self.assertNumQueries(len(baseline)):
+            self.request(method, url, data)
+
+    def test_service_list(self):
+        self.assert_constant_queries("get", reverse("carWashService") + "?page_size=50")
+
+    def test_service_list_by_employee(self):
+        self.assert_constant_queries("get", reverse("carWashService") + "?empid=emp0")
+
+    def test_service_stream(self):
+        self.assert_constant_queries("get", reverse("carWashService") + "?stream=true")
+
+    def test_services_count(self):
+        self.assert_constant_queries("post", reverse("servicesCount") + "?page_size=50", {"period": "today"})
+
+    def test_customer_list(self):
+        self.assert_constant_queries("get", reverse("customer"))
+
+    def test_employee_list(self):
+        self.assert_constant_queries("get", reverse("employee"))
+
+
+class ResponseCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = EmployeesModel.objects.create_user("admin1", 5000, True, "pass1234")
+        cls.customer = Customer.objects.create(email="c@example.com", first_name="C", last_name="X")
+
+    def setUp(self):
+        caches["responses"].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.url = reverse("carWashService")
+
+    def test_repeated_request_is_served_from_cache(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_matching_etag_returns_not_modified(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+    def test_writes_invalidate_cached_responses(self):
+        etag = self.client.get(self.url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            service = CarWashService.objects.create(customer=self.customer)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["id"] for row in response.json()["results"]], [service.id])
+
+        etag = response["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            service.delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()["results"], [])
+
+    def test_bulk_create_invalidates_cached_responses(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, [{"employee": self.admin.id, "customer": self.customer.id, "status": "pending"}], format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(self.client.get(self.url).json()["results"]), 1)
+
+    def test_invalidation_waits_for_the_commit(self):
+        first = self.client.get(self.url)
+        with self.captureOnCommitCallbacks() as callbacks:
+            CarWashService.objects.create(customer=self.customer)
+            # Not committed yet: other requests still get the old generation
+            self.assertEqual(self.client.get(self.url).content, first.content)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(self.client.get(self.url).json()["results"]), 1)
+
+    def test_lost_generation_does_not_revive_old_entries(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate("services")
+        self.assertEqual(self.client.get(self.url).json()["results"], [])
+        caches["response_generations"].clear()  # The counter is lost and starts again
+        with self.captureOnCommitCallbacks(execute=True):
+            CarWashService.objects.create(customer=self.customer)
+        self.assertEqual(len(self.client.get(self.url).json()["results"]), 1)
+
+    def test_culling_the_responses_keeps_the_generations(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate("services")
+        caches["responses"].clear()
+        self.assertIsNotNone(caches["response_generations"].get("generation:services"))
+
+
+class ReviewSummaryTests(TestCase):
+
+    def setUp(self):
+        caches["responses"].clear()
+
+    def summary(self):
+        with self.assertNumQueries(1):
+            response = APIClient().get(reverse("reviewSummary"))
+        return response.json()
+
+    def test_summary_follows_review_writes(self):
+        self.assertEqual(self.summary(), {"count": 0, "average": None,
+                                          "histogram": {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0}})
+        with self.captureOnCommitCallbacks(execute=True):
+            reviews = [Reviewmodel.objects.create(ratings=rating, review="ok") for rating in (5, 4, 4, 1)]
+        self.assertEqual(self.summary(), {"count": 4, "average": 3.5,
+                                          "histogram": {"1": 1, "2": 0, "3": 0, "4": 2, "5": 1}})
+        with self.captureOnCommitCallbacks(execute=True):
+            reviews[0].ratings = 2
+            reviews[0].save()
+            reviews[3].delete()
+        self.assertEqual(self.summary(), {"count": 3, "average": 3.33,
+                                          "histogram": {"1": 0, "2": 1, "3": 0, "4": 2, "5": 0}})
+
+
+class StaticPageTests(SimpleTestCase):
+    """AboutUs and SocialLinks answer from prebuilt responses, without the database."""
+
+    def test_about_us_is_cacheable(self):
+        response = self.client.get(reverse("about_us"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, "Carsss is a leading car wash company")
+        self.assertEqual(response["Cache-Control"], "public, max-age=86400")
+        response = self.client.get(reverse("about_us"), HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+    def test_social_links_redirect(self):
+        etags = {}
+        for name, url in SocialLinks.PLATFORM_REDIRECTS.items():
+            response = self.client.get(reverse("social_links"), {"name": name})
+            self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+            self.assertEqual(response["Location"], url)
+            etags[name] = response["ETag"]
+        self.assertEqual(len(set(etags.values())), len(etags))
+        response = self.client.get(reverse("social_links"), {"name": "youtube"}, HTTP_IF_NONE_MATCH=etags["youtube"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(reverse("social_links"), {"name": "twitter"}, HTTP_IF_NONE_MATCH=etags["youtube"])
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+
+    def test_social_links_unsupported_platform(self):
+        for response in (self.client.get(reverse("social_links"), {"name": "myspace"}),
+                         self.client.get(reverse("social_links"))):
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.json(), {"error": "Platform not supported"})
+            self.assertEqual(response["Cache-Control"], "public, max-age=3600")
+
+    def test_social_links_post(self):
+        response = self.client.post(reverse("social_links"), {"name": "twitter"}, content_type="application/json")
+        self.assertEqual(response["Location"], SocialLinks.PLATFORM_REDIRECTS["twitter"])
+        response = self.client.post(reverse("social_links"), {"name": "instagram"})  # Form data
+        self.assertEqual(response["Location"], SocialLinks.PLATFORM_REDIRECTS["instagram"])
+        response = self.client.post(reverse("social_links"), "{", content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(response.json()["detail"].startswith("JSON parse error"))
+
+
+@override_settings(DATABASE_REPLICA_ALIAS="replica")
+class ReplicaRouterTests(SimpleTestCase):
+
+    def test_reads_use_primary_unless_opted_in(self):
+        self.assertEqual(CarWashService.objects.all().db, "default")
+        with replica_reads():
+            self.assertEqual(CarWashService.objects.all().db, "replica")
+        self.assertEqual(CarWashService.objects.all().db, "default")
+
+    def test_reads_stick_to_primary_after_a_write(self):
+        with replica_reads():
+            self.assertEqual(router.db_for_write(CarWashService), "default")
+            self.assertEqual(CarWashService.objects.all().db, "default")
+        with replica_reads():  # The next request starts on the replica again
+            self.assertEqual(CarWashService.objects.all().db, "replica")
+
+    @override_settings(DATABASE_REPLICA_ALIAS=None)
+    def test_no_replica_configured(self):
+        with replica_reads():
+            self.assertEqual(CarWashService.objects.all().db, "default")
+
+
+@override_settings(DATABASE_REPLICA_ALIAS="replica")
+class ReplicaRoutingViewTests(TransactionTestCase):
+    """Reporting endpoints read from the replica alias (a test mirror of the primary)."""
+
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        caches["responses"].clear()
+        self.admin = EmployeesModel.objects.create_user("admin1", 5000, True, "pass1234")
+        customer = Customer.objects.create(email="c@example.com", first_name="C", last_name="X")
+        CarWashService.objects.create(employee=self.admin, customer=customer)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def assert_reads_on_replica(self, method, url, data=None):
+        with CaptureQueriesContext(connections["default"]) as primary, \
+                CaptureQueriesContext(connections["replica"]) as replica:
+            response = getattr(self.client, method)(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(any("app1_carwashservice" in q["sql"] for q in replica.captured_queries))
+        self.assertFalse(any("app1_carwashservice" in q["sql"] for q in primary.captured_queries))
+        return response
+
+    def test_service_list(self):
+        response = self.assert_reads_on_replica("get", reverse("carWashService"))
+        self.assertEqual(len(response.json()["results"]), 1)
+
+    def test_services_count(self):
+        response = self.assert_reads_on_replica("post", reverse("servicesCount"), {"period": "today"})
+        self.assertEqual(response.json()["count"], 1)
+
+    def test_reads_after_a_write_use_primary(self):
+        with replica_reads(), CaptureQueriesContext(connections["replica"]) as replica:
+            CarWashService.objects.count()
+            CarWashService.objects.update(status="completed")
+            CarWashService.objects.count()
+        self.assertEqual(len(replica.captured_queries), 1)
+
+
+class AsyncCrudViewTests(TestCase):
+    """The async CRUD views answer like their APIView counterparts."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = EmployeesModel.objects.create_user("admin1", 5000, True, "pass1234")
+        cls.employee = EmployeesModel.objects.create_user("emp1", 100, False, "pass1234")
+        cls.customer = Customer.objects.create(email="c@example.com", first_name="C", last_name="X")
+        CarWashService.objects.bulk_create(
+            CarWashService(employee=cls.admin, customer=cls.customer) for _ in range(3))
+
+    def setUp(self):
+        caches["responses"].clear()
+        self.factory = AsyncRequestFactory()
+
+    async def call(self, view, method, path, user=None, data=None, **kwargs):
+        headers = {}
+        if user is not None:
+            tokens = await sync_to_async(get_tokens_for_user)(user)
+            headers["Authorization"] = f"Bearer {tokens['access']}"
+        if data is None:
+            request = getattr(self.factory, method)(path, headers=headers)
+        else:
+            request = getattr(self.factory, method)(path, data, content_type="application/json", headers=headers)
+        return await view.as_view()(request, **kwargs)
+
+    async def test_service_list_matches_sync_view(self):
+        url = reverse("carWashService") + "?page_size=2"
+        response = await self.call(async_views.CarWashServiceView, "get", url, self.admin)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        client = APIClient()
+        client.force_authenticate(self.admin)
+
+        def sync_get():
+            with CaptureQueriesContext(connection) as queries:
+                return client.get(url), len(queries)
+
+        sync_response, queries = await sync_to_async(sync_get)()
+        self.assertGreater(queries, 0)  # Rendered by the sync view, not replayed from the async view's entry
+        self.assertEqual(response.content, sync_response.content)
+
+    async def test_authentication_and_admin_permission(self):
+        url = reverse("employee")
+        response = await self.call(async_views.EmployeeAPIView, "get", url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = await self.call(async_views.EmployeeAPIView, "get", url, self.employee)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(json.loads(response.content), {"detail": "Permission denied.(You are not admin)"})
+
+    async def test_customer_create_and_delete(self):
+        data = {"email": "n@example.com", "first_name": "N", "last_name": "M",
+                "password": "pw", "password_confirm": "pw"}
+        response = await self.call(async_views.CustomerAPI, "post", reverse("customer"), self.admin, data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        customer = await Customer.objects.aget(email="n@example.com")
+        self.assertTrue(customer.password.startswith("pbkdf2_sha256$"))
+        response = await self.call(async_views.CustomerAPI, "delete", reverse("CustomerAPI", args=[customer.pk]),
+                                   self.admin, pk=customer.pk)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(await Customer.objects.filter(pk=customer.pk).aexists())
+
+
+class CustomerTokenTests(TestCase):
+    """Customer tokens never authenticate as the employee that shares the customer's id."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = EmployeesModel.objects.create_user("admin1", 5000, True, "pass1234")
+        cls.customer = Customer.objects.create(pk=cls.admin.pk, email="c@example.com", first_name="C",
+                                               last_name="X", password=make_password("pw"))
+        CarWashService.objects.create(customer=cls.customer)
+
+    def setUp(self):
+        response = APIClient().post(reverse("customerLogin"), {"email": "c@example.com", "password": "pw"},
+                                    format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.access = response.json()["access"]
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access}")
+
+    def assert_rejected(self):
+        for method, name in (("get", "employee"), ("post", "claimService"), ("post", "servicesCount")):
+            with self.subTest(name):
+                response = getattr(self.client, method)(reverse(name), {"period": "today"}, format="json")
+                self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(CarWashService.objects.get().status, "pending")
+
+    def test_customer_id_has_its_own_claim(self):
+        refresh = get_refresh_token_for_customer(self.customer)
+        self.assertEqual(refresh["customer_id"], self.customer.pk)
+        self.assertNotIn("user_id", refresh)
+        self.assertNotIn("user_id", refresh.access_token)
+
+    def test_rejected_on_employee_and_admin_endpoints(self):
+        self.assert_rejected()
+
+    @override_settings(REST_FRAMEWORK={
+        "DEFAULT_AUTHENTICATION_CLASSES": ["app1.tokens.EmployeeJWTStatelessUserAuthentication"]})
+    def test_rejected_by_stateless_authentication(self):
+        self.assert_rejected()
+
+    def test_customer_logout(self):
+        refresh = get_refresh_token_for_customer(self.customer)
+        response = self.client.post(reverse("customerLogout"), {"refresh_token": str(refresh)}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        employee_client = APIClient()
+        employee_client.credentials(HTTP_AUTHORIZATION=f"Bearer {get_tokens_for_user(self.admin)['access']}")
+        response = employee_client.post(reverse("customerLogout"), {"refresh_token": str(refresh)}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_rejected_by_async_views(self):
+        request = AsyncRequestFactory().get(reverse("employee"), headers={"Authorization": f"Bearer {self.access}"})
+        response = await async_views.EmployeeAPIView.as_view()(request)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TokenRefreshTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = EmployeesModel.objects.create_user("emp1", 100, False, "pass1234")
+        cls.customer = Customer.objects.create(email="c@example.com", first_name="C", last_name="X")
+
+    def setUp(self):
+        cache.clear()
+
+    def refresh(self, token):
+        return APIClient().post(reverse("tokenRefresh"), {"refresh": str(token)}, format="json")
+
+    def test_employee_token(self):
+        response = self.refresh(get_tokens_for_user(self.employee)["refresh"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("access", response.json())
+
+    @override_settings(REST_FRAMEWORK={
+        "DEFAULT_AUTHENTICATION_CLASSES": ["app1.tokens.EmployeeJWTStatelessUserAuthentication"]})
+    def test_demoted_admin_gets_no_admin_access_token(self):
+        admin = EmployeesModel.objects.create_user("admin1", 5000, True, "pass1234")
+        refresh = get_tokens_for_user(admin)["refresh"]
+        EmployeesModel.objects.filter(pk=admin.pk).update(is_admin=False)
+        access = self.refresh(refresh).json()["access"]
+        self.assertIs(AccessToken(access)["is_admin"], False)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        response = client.post(reverse("servicesCount"), {"period": "today"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_customer_and_unknown_user_tokens_are_refused(self):
+        legacy = tokens.CachedRefreshToken()
+        legacy["user_id"] = self.employee.pk + 1000  # Customer tokens used to carry the customer's id here
+        for token in (get_refresh_token_for_customer(self.customer), legacy):
+            response = self.refresh(token)
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+            self.assertEqual(response.json(), {"detail": "No active account found for the given token."})
+
+    def test_inactive_employee_and_logged_out_tokens_are_refused(self):
+        refresh = get_tokens_for_user(self.employee)["refresh"]
+        EmployeesModel.objects.filter(pk=self.employee.pk).update(is_active=False)
+        self.assertEqual(self.refresh(refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+        EmployeesModel.objects.filter(pk=self.employee.pk).update(is_active=True)
+        tokens.CachedRefreshToken(refresh).blacklist()
+        self.assertEqual(self.refresh(refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TokenBlacklistCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = EmployeesModel.objects.create_user("emp1", 100, False, "pass1234")
+
+    def setUp(self):
+        cache.clear()
+        self.token = tokens.CachedRefreshToken.for_user(self.employee)
+
+    @override_settings(JWT_BLACKLIST_NEGATIVE_TTL=0)
+    def test_miss_is_not_cached_by_default(self):
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                self.assertFalse(tokens.is_blacklisted(self.token))
+
+    @override_settings(JWT_BLACKLIST_NEGATIVE_TTL=60)
+    def test_miss_is_cached_for_the_negative_ttl(self):
+        with mock.patch.object(tokens.cache, "set", wraps=tokens.cache.set) as cache_set, self.assertNumQueries(1):
+            self.assertFalse(tokens.is_blacklisted(self.token))
+        cache_set.assert_called_once_with(f"jwt-blacklist:{self.token['jti']}", tokens.NOT_BLACKLISTED, 60)
+        with self.assertNumQueries(0):
+            self.assertFalse(tokens.is_blacklisted(self.token))
+
+    def test_blacklisting_writes_through_to_the_cache(self):
+        self.token.blacklist()
+        BlacklistedToken.objects.all().delete()  # Only the cache can answer now
+        with self.assertNumQueries(0):
+            self.assertTrue(tokens.is_blacklisted(self.token))
+
+    def test_hit_from_the_database_is_cached(self):
+        outstanding = OutstandingToken.objects.get(jti=self.token["jti"])
+        BlacklistedToken.objects.create(token=outstanding)
+        with self.assertNumQueries(1):
+            self.assertTrue(tokens.is_blacklisted(self.token))
+        with self.assertNumQueries(0):
+            self.assertTrue(tokens.is_blacklisted(self.token))
+
+    def test_entries_expire_with_the_token(self):
+        lifetime = int(jwt_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+        self.token.set_exp(lifetime=timedelta(minutes=5))
+        with mock.patch.object(tokens.cache, "set") as cache_set:
+            tokens.mark_blacklisted(self.token)
+            self.token.set_exp(lifetime=jwt_settings.REFRESH_TOKEN_LIFETIME * 3)
+            tokens.mark_blacklisted(self.token)
+        short, long = (call.args[2] for call in cache_set.call_args_list)
+        self.assertIn(short, (299, 300))  # The exp claim drops the fraction of a second
+        self.assertEqual(long, lifetime)
+
+
+class PruneTokensCommandTests(TestCase):
+
+    def test_deletes_expired_tokens_and_their_blacklist_entries(self):
+        employee = EmployeesModel.objects.create_user("emp1", 100, False, "pass1234")
+        now = timezone.now()
+        expired = [OutstandingToken.objects.create(user=employee, jti=f"old{i}", token="x",
+                                                   expires_at=now - timedelta(minutes=1)) for i in range(3)]
+        live = OutstandingToken.objects.create(user=employee, jti="live", token="x",
+                                               expires_at=now + timedelta(days=1))
+        BlacklistedToken.objects.create(token=expired[0])
+        BlacklistedToken.objects.create(token=live)
+        stdout = io.StringIO()
+        call_command("prune_tokens", "--batch-size", "2", stdout=stdout)
+        self.assertEqual(list(OutstandingToken.objects.values_list("jti", flat=True)), ["live"])
+        self.assertEqual(list(BlacklistedToken.objects.values_list("token__jti", flat=True)), ["live"])
+        self.assertIn("Pruned 3 expired tokens (1 blacklisted).", stdout.getvalue())
+
+
+class RegistrationQueryTests(TestCase):
+    """Registration is a single INSERT; duplicates are caught by the unique constraint."""
+
+    def writes(self, captured):
+        return [q["sql"] for q in captured if not q["sql"].startswith(("SAVEPOINT", "RELEASE", "ROLLBACK"))]
+
+    def register(self, url, data):
+        with CaptureQueriesContext(connection) as captured:
+            response = APIClient().post(url, data, format="json")
+        return response, self.writes(captured)
+
+    def test_customer_registration(self):
+        data = {"email": "c@example.com", "first_name": "C", "last_name": "X",
+                "password": "pw", "password_confirm": "pw"}
+        response, queries = self.register(reverse("customerRegister"), data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0].startswith("INSERT"))
+        self.assertTrue(Customer.objects.get(email="c@example.com").password.startswith("pbkdf2_sha256$"))
+
+        response, queries = self.register(reverse("customerRegister"), data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {"email": ["customer with this email already exists."]})
+
+    def test_employee_registration(self):
+        data = {"employee_name": "emp1", "salary": "100.00", "is_admin": False,
+                "password": "pw", "password2": "pw"}
+        response, queries = self.register(reverse("empRegister"), data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(queries), 1)
+
+        response, queries = self.register(reverse("empRegister"), data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {"employee_name": ["employees model with this employee name already exists."]})
+
+
+@override_settings(PASSWORD_HASH_PARAMS={"pbkdf2_iterations": 2000, "scrypt_work_factor": 2 ** 10})
+class PasswordUpgradeTests(TestCase):
+    """Hashes made with another hasher or a lower cost are replaced on the next successful login."""
+
+    def login(self, url, data):
+        response = APIClient().post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_customer_hash_is_upgraded(self):
+        with override_settings(PASSWORD_HASH_PARAMS={"pbkdf2_iterations": 1000}):
+            fewer_iterations = make_password("pw")
+        for old_hash in (make_password("pw", hasher="scrypt"), fewer_iterations):
+            with self.subTest(old_hash.split("$")[0]):
+                Customer.objects.update_or_create(email="c@example.com", defaults={
+                    "first_name": "C", "last_name": "X", "password": old_hash})
+                self.login(reverse("customerLogin"), {"email": "c@example.com", "password": "pw"})
+                new_hash = Customer.objects.get(email="c@example.com").password
+                self.assertTrue(new_hash.startswith("pbkdf2_sha256$2000$"), new_hash)
+                self.assertTrue(check_password("pw", new_hash))
+
+    def test_employee_hash_is_upgraded(self):
+        employee = EmployeesModel.objects.create_user("emp1", 100, False, "pw")
+        with override_settings(PASSWORD_HASH_PARAMS={"pbkdf2_iterations": 1000}):
+            EmployeesModel.objects.filter(pk=employee.pk).update(password=make_password("pw"))
+        self.login(reverse("employeeLogin"), {"employee_name": "emp1", "password": "pw"})
+        employee.refresh_from_db()
+        self.assertTrue(employee.password.startswith("pbkdf2_sha256$2000$"), employee.password)
+
+    def test_failed_login_keeps_the_old_hash(self):
+        old_hash = make_password("pw", hasher="scrypt")
+        Customer.objects.create(email="c@example.com", first_name="C", last_name="X", password=old_hash)
+        response = APIClient().post(reverse("customerLogin"), {"email": "c@example.com", "password": "wrong"},
+                                    format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Customer.objects.get(email="c@example.com").password, old_hash)
+
+
+class CustomerImportTests(TestCase):
+
+    CSV = ("email,first_name,last_name,password\n"
+           "a@example.com,A,One,pw-a\n"
+           "not-an-email,B,Two,pw-b\n"
+           "c@example.com,C,Three,pw-c\n"
+           "a@example.com,A,Again,pw-a2\n")
+
+    def run_import(self, **kwargs):
+        return import_customers(read_rows(io.StringIO(self.CSV), "csv"), chunk_size=2, **kwargs)
+
+    def test_import_creates_customers_and_reports_bad_rows(self):
+        Customer.objects.create(email="c@example.com", first_name="Old", last_name="Name")
+        result = self.run_import()
+        self.assertEqual((result["rows"], result["created"], result["skipped"], result["invalid"]), (4, 1, 2, 1))
+        self.assertEqual(result["errors"][0]["line"], 3)
+        customer = Customer.objects.get(email="a@example.com")
+        self.assertTrue(check_password("pw-a", customer.password))
+        self.assertEqual(Customer.objects.get(email="c@example.com").first_name, "Old")
+
+    def test_import_can_update_existing_customers(self):
+        Customer.objects.create(email="c@example.com", first_name="Old", last_name="Name")
+        result = self.run_import(update_existing=True)
+        self.assertEqual((result["created"], result["updated"]), (1, 2))
+        self.assertEqual(Customer.objects.get(email="c@example.com").first_name, "C")
+        self.assertTrue(check_password("pw-a2", Customer.objects.get(email="a@example.com").password))
+
+
+class LeaderboardTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = EmployeesModel.objects.create_user("admin1", 5000, True, "pass1234")
+        cls.employees = [EmployeesModel.objects.create_user(f"emp{i}", 100, False, "pass1234") for i in range(3)]
+        customer = Customer.objects.create(email="c@example.com", first_name="C", last_name="X")
+        for employee, service_type in [(cls.employees[0], "full_carwash"), (cls.employees[0], "only_body"),
+                                       (cls.employees[1], "full_with_polish"), (cls.employees[1], "only_polish")]:
+            CarWashService.objects.create(employee=employee, customer=customer, service_type=service_type)
+
+    def setUp(self):
+        caches["responses"].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_ranks_employees_by_revenue_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("leaderboard"), {"period": "today"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(row["rank"], row["employee_name"], row["count"], row["revenue"]) for row in response.json()["employees"]],
+            [(1, "emp1", 2, 130), (2, "emp0", 2, 100), (3, "admin1", 0, 0), (3, "emp2", 0, 0)])
+
+    def test_custom_date_range(self):
+        response = self.client.get(reverse("leaderboard"), {"start_date": "2000-01-01", "end_date": "2000-01-31"})
+        self.assertEqual(response.json()["start_date"], "2000-01-01")
+        self.assertEqual({row["count"] for row in response.json()["employees"]}, {0})
+        response = self.client.get(reverse("leaderboard"), {"start_date": "2000-01-31", "end_date": "2000-01-01"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SalesSeriesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = EmployeesModel.objects.create_user("admin1", 5000, True, "pass1234")
+        customer = Customer.objects.create(email="c@example.com", first_name="C", last_name="X")
+        for service_type in ("full_carwash", "only_body", "only_polish"):
+            CarWashService.objects.create(employee=cls.admin, customer=customer, service_type=service_type)
+
+    def setUp(self):
+        caches["responses"].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.today = timezone.localdate()
+
+    def test_daily_series_is_zero_filled(self):
+        start_day = self.today - timedelta(days=2)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("salesSeries"), {
+                "interval": "day", "start_date": start_day.isoformat(), "end_date": self.today.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.json()
+        self.assertEqual(body["buckets"], [(start_day + timedelta(days=i)).isoformat() for i in range(3)])
+        self.assertEqual(body["count"], [0, 0, 3])
+        self.assertEqual(body["revenue"], [0, 0, 130])
+
+    def test_hourly_series_counts_services(self):
+        response = self.client.get(reverse("salesSeries"), {"interval": "hour", "period": "today"})
+        body = response.json()
+        self.assertEqual(len(body["buckets"]), 24)
+        self.assertEqual((sum(body["count"]), sum(body["revenue"])), (3, 130))
+
+    @override_settings(TIME_ZONE="Europe/Berlin")
+    def test_hourly_buckets_on_dst_transition_days(self):
+        for day, hours in ((date(2024, 3, 31), 23), (date(2024, 10, 27), 25)):
+            with self.subTest(day=day):
+                buckets = list(DailySalesRollup.series_buckets("hour", day, day))
+                self.assertEqual(len(buckets), hours)
+                # Same-zone datetime arithmetic ignores the UTC offset, so compare timestamps.
+                stamps = [bucket.timestamp() for bucket in buckets]
+                self.assertEqual(stamps, [stamps[0] + 3600 * i for i in range(hours)])
+                self.assertEqual(buckets[0].hour, 0)
+                self.assertEqual(buckets[-1].hour, 23)
+
+    def test_rejects_too_many_buckets(self):
+        response = self.client.get(reverse("salesSeries"), {
+            "interval": "hour", "start_date": "2000-01-01", "end_date": "2000-12-31"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse("salesSeries"), {"interval": "minute"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SalesRollupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.washers = [EmployeesModel.objects.create_user(f"emp{i}", 100, False, "pass1234") for i in range(2)]
+        cls.customer = Customer.objects.create(email="c@example.com", first_name="C", last_name="X")
+
+    def setUp(self):
+        self.today = timezone.localdate()
+
+    def rollup(self):
+        """Non-empty rollup rows as {(employee id, service type, status): (count, revenue)}."""
+        return {(row.employee_id, row.service_type, row.status): (row.count, row.revenue)
+                for row in DailySalesRollup.objects.filter(count__gt=0)}
+
+    def create(self, **fields):
+        return CarWashService.objects.create(customer=self.customer, **{"employee": self.washers[0], **fields})
+
+    def test_create_adds_to_the_rollup(self):
+        self.create(service_type="full_carwash")
+        self.create(service_type="full_carwash")
+        self.create(employee=None, service_type="only_body")
+        self.assertEqual(self.rollup(), {
+            (self.washers[0].pk, "full_carwash", "pending"): (2, 140),
+            (None, "only_body", "pending"): (1, 30),
+        })
+
+    def test_status_change_and_reassignment_move_the_service(self):
+        service = self.create(service_type="full_with_polish")
+        service.status = "completed"
+        service.save()
+        self.assertEqual(self.rollup(), {(self.washers[0].pk, "full_with_polish", "completed"): (1, 100)})
+        service.employee = self.washers[1]
+        service.service_type = "only_polish"
+        service.save()
+        self.assertEqual(self.rollup(), {(self.washers[1].pk, "only_polish", "completed"): (1, 30)})
+
+    def test_delete_removes_the_service(self):
+        kept = self.create(service_type="inside_vacuum")
+        self.create(service_type="inside_vacuum").delete()
+        self.assertEqual(self.rollup(), {(self.washers[0].pk, "inside_vacuum", "pending"): (1, 40)})
+        kept.delete()
+        self.assertEqual(self.rollup(), {})
+
+    def test_rebuild_command_repairs_the_rollup(self):
+        self.create(service_type="full_carwash")
+        self.create(service_type="only_body", status="completed")
+        expected = self.rollup()
+        DailySalesRollup.objects.update(count=99, revenue=0)
+        stdout = io.StringIO()
+        call_command("rebuild_sales_rollup", stdout=stdout)
+        self.assertEqual(self.rollup(), expected)
+        self.assertIn("Rebuilt 2 rollup rows.", stdout.getvalue())
+
+    def test_rebuild_command_invalidates_cached_responses(self):
+        self.create(service_type="full_carwash")
+        DailySalesRollup.objects.update(count=99)
+        client = APIClient()
+        client.force_authenticate(EmployeesModel.objects.create_user("admin1", 5000, True, "pass1234"))
+        caches["responses"].clear()
+        stale = client.get(reverse("leaderboard"), {"period": "today"}).json()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("rebuild_sales_rollup", stdout=io.StringIO())
+        fresh = client.get(reverse("leaderboard"), {"period": "today"}).json()
+        self.assertEqual([row["count"] for row in stale["employees"]][:1], [99])
+        self.assertEqual([row["count"] for row in fresh["employees"]][:1], [1])
+
+    def test_rebuild_command_date_range(self):
+        self.create(service_type="full_carwash")
+        DailySalesRollup.objects.update(count=99)
+        yesterday = (self.today - timedelta(days=1)).isoformat()
+        call_command("rebuild_sales_rollup", "--end", yesterday, stdout=io.StringIO())
+        self.assertEqual(self.rollup(), {(self.washers[0].pk, "full_carwash", "pending"): (99, 70)})
+        call_command("rebuild_sales_rollup", "--start", self.today.isoformat(), stdout=io.StringIO())
+        self.assertEqual(self.rollup(), {(self.washers[0].pk, "full_carwash", "pending"): (1, 70)})
+        with self.assertRaises(CommandError):
+            call_command("rebuild_sales_rollup", "--start", "yesterday", stdout=io.StringIO())
+
+
+class SalesRollupTransactionTests(TransactionTestCase):
+
+    def test_service_is_not_saved_without_its_rollup(self):
+        customer = Customer.objects.create(email="c@example.com", first_name="C", last_name="X")
+        with mock.patch.object(DailySalesRollup, "record_services", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                CarWashService.objects.create(customer=customer, service_type="full_carwash")
+        self.assertFalse(CarWashService.objects.exists())
+        self.assertFalse(DailySalesRollup.objects.exists())
+
+
+@override_settings(PERF_TIMING=True, PERF_SLOW_REQUEST_MS=0, PERF_SLOW_SAMPLE_RATE=1.0)
+class PerformanceTimingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = EmployeesModel.objects.create_user("admin1", 5000, True, "pass1234")
+        customer = Customer.objects.create(email="c@example.com", first_name="C", last_name="X")
+        CarWashService.objects.create(employee=cls.admin, customer=customer, service_type="full_carwash")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_server_timing_header_and_slow_request_log(self):
+        with self.assertLogs("app1.performance", "WARNING") as logs:
+            response = self.client.post(reverse("servicesCount"), {"period": "today"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timing = response["Server-Timing"]
+        for name in ("total;dur=", "db;dur=", "serialize;dur=", "render;dur="):
+            self.assertIn(name, timing)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["view"], "servicesCount")
+        self.assertGreater(record["queries"], 0)
+        self.assertEqual(len(record["slow_queries"]), min(record["queries"], 10))
+        self.assertIn("SELECT", record["slow_queries"][0]["sql"])
+
+    @override_settings(PERF_TIMING=False)
+    def test_off_by_default(self):
+        response = APIClient().get(reverse("about_us"))
+        self.assertNotIn("Server-Timing", response)
+
+
+@override_settings(METRICS_TOKEN="secret")
+class MetricsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = EmployeesModel.objects.create_user("admin1", 5000, True, "pass1234")
+
+    def login_failures(self):
+        return metrics.collect()["login_attempts_total"].get(("employee", "failure"), 0)
+
+    def test_exposes_request_and_login_metrics(self):
+        failures = self.login_failures()
+        response = APIClient().post(reverse("employeeLogin"),
+                                    {"employee_name": "admin1", "password": "wrong"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.login_failures(), failures + 1)
+
+        response = self.client.get(reverse("metrics"), headers={"Authorization": "Bearer secret"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        text = response.content.decode()
+        self.assertIn(f'login_attempts_total{{account="employee",result="failure"}} {failures + 1}', text)
+        self.assertIn('http_requests_total{view="employeeLogin",method="POST",status="401"}', text)
+        self.assertIn('http_request_duration_seconds_bucket{view="employeeLogin",method="POST",le="+Inf"}', text)
+        self.assertIn("# TYPE db_queries_per_request histogram", text)
+
+    def test_multiprocess_samples_are_added_up(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_MULTIPROC_DIR=directory):
+            failures = self.login_failures()
+            with open(f"{directory}/999999.json", "w") as other_worker:
+                json.dump({"login_attempts_total": [[["employee", "failure"], 5]]}, other_worker)
+            self.assertEqual(self.login_failures(), failures + 5)
+
+    def test_token_required(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get(reverse("metrics"), headers={"Authorization": "Bearer wrong"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        with override_settings(METRICS_TOKEN=""):
+            response = self.client.get(reverse("metrics"), headers={"Authorization": "Bearer "})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_concurrent_flushes(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_MULTIPROC_DIR=directory):
+            with ThreadPoolExecutor(8) as pool:
+                for future in [pool.submit(metrics.flush) for _ in range(50)]:
+                    future.result()
+            self.assertEqual([path.name for path in Path(directory).iterdir()], [f"{os.getpid()}.json"])
+            self.assertIn("login_attempts_total", json.loads((Path(directory) / f"{os.getpid()}.json").read_text()))
+
+    def test_flush_errors_do_not_fail_requests(self):
+        with override_settings(METRICS_MULTIPROC_DIR="/nonexistent/metrics", METRICS_FLUSH_INTERVAL=0):
+            with self.assertLogs("app1.metrics", "ERROR"):
+                response = APIClient().post(reverse("employeeLogin"),
+                                            {"employee_name": "admin1", "password": "wrong"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class FastListRenderingTests(TestCase):
+    """The list views' values() projection and orjson rendering must produce the
+    same bytes as the ModelSerializers and JSONRenderer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = EmployeesModel.objects.create_user("admin1", "1234.5", True, "pass1234")
+        EmployeesModel.objects.create_user("emp1", 99, False, "pass1234")
+        customers = [
+            Customer.objects.create(email="zoe@example.com", first_name="Zoë \u2028 \"Z\"", last_name="日本\t\x01"),
+            Customer.objects.create(email="b@example.com", first_name="B", last_name="</script>", employee=cls.admin),
+        ]
+        CarWashService.objects.create(employee=cls.admin, customer=customers[0], service_type="full_with_polish")
+        CarWashService.objects.create(employee=None, customer=customers[1], status="completed")
+
+    def setUp(self):
+        caches["responses"].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def assertSameBytes(self, url_name, expected):
+        response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, JSONRenderer().render(expected))
+
+    def test_employee_list(self):
+        self.assertSameBytes("employee", EmployeeSerializer(EmployeesModel.objects.all(), many=True).data)
+
+    def test_customer_list(self):
+        customers = Customer.objects.filter(Q(employee_id=self.admin.id) | Q(employee__isnull=True))
+        self.assertSameBytes("customer", CustomerSerilizer(customers, many=True).data)
+
+    def test_service_list(self):
+        services = CarWashService.objects.order_by("-service_date", "-id")
+        self.assertSameBytes("carWashService", {
+            "next": None, "previous": None, "results": CarWashServiceSerializer(services, many=True).data})
+
+    @override_settings(TIME_ZONE="Asia/Kolkata")
+    def test_service_list_in_local_time(self):
+        self.test_service_list()
+
+    def test_renderer_matches_json_renderer(self):
+        data = {"text": "a\u2028b\u2029 é \"q\" \\ \n", "n": [1, -2, 2 ** 40, True, None],
+                "decimal": Decimal("1.50"), "error": ErrorDetail("bad", code="invalid"), "when": date(2026, 1, 2)}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(data["n"]), JSONRenderer().render(data["n"]))
+
+
+class ClaimServiceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = EmployeesModel.objects.create_user("admin1", 5000, True, "pass1234")
+        cls.washer = EmployeesModel.objects.create_user("washer1", 100, False, "pass1234")
+        cls.customer = Customer.objects.create(email="c@example.com", first_name="C", last_name="X")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.washer)
+
+    def create_job(self, **fields):
+        admin = APIClient()
+        admin.force_authenticate(self.admin)
+        response = admin.post(reverse("carWashService"), {
+            "service_type": "full_carwash", "employee": None, "customer": self.customer.id,
+            "status": "pending", **fields}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.json()["id"]
+
+    def rollup_counts(self):
+        return dict(DailySalesRollup.objects.filter(count__gt=0).values_list("status", "count"))
+
+    def test_claims_oldest_pending_job_once(self):
+        self.create_job(status="completed", employee=self.admin.id)
+        first, second = self.create_job(), self.create_job()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("claimService"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.json()["id"], response.json()["employee"], response.json()["status"]),
+                         (first, self.washer.id, "in_progress"))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(reverse("claimService")).json()["id"], second)
+            self.assertEqual(self.client.post(reverse("claimService")).status_code, status.HTTP_204_NO_CONTENT)
+
+        # The daily rollup follows the job once the claims have committed
+        self.assertEqual(DailySalesRollup.totals(timezone.localdate(), timezone.localdate())["count"], 3)
+        self.assertEqual(DailySalesRollup.objects.get(employee=self.washer, status="in_progress").count, 2)
+        self.assertFalse(DailySalesRollup.objects.filter(status="pending", count__gt=0).exists())
+
+    def test_claims_job_from_a_batch_upload(self):
+        admin = APIClient()
+        admin.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = admin.post(reverse("carWashService"), [
+                {"service_type": "only_body", "employee": None, "customer": self.customer.id, "status": "pending"},
+                {"service_type": "only_polish", "customer": self.customer.id, "status": "pending"},
+            ], format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(CarWashService.objects.filter(employee__isnull=True).count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("claimService"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.json()["service_type"], response.json()["employee"]),
+                         ("only_body", self.washer.id))
+        self.assertEqual(self.rollup_counts(), {"pending": 1, "in_progress": 1})
+
+    def test_rollup_is_not_written_inside_the_claim(self):
+        self.create_job()
+        with self.captureOnCommitCallbacks() as callbacks, CaptureQueriesContext(connection) as queries:
+            self.assertIsNotNone(CarWashService.claim_next(self.washer.id))
+        self.assertFalse([query["sql"] for query in queries.captured_queries
+                          if DailySalesRollup._meta.db_table in query["sql"]])
+        self.assertTrue(DailySalesRollup.objects.filter(status="pending", count=1).exists())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.rollup_counts(), {"in_progress": 1})
+
+    def test_requires_login(self):
+        self.assertEqual(APIClient().post(reverse("claimService")).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@skipUnless(connection.vendor == "postgresql", "needs SELECT ... FOR UPDATE SKIP LOCKED")
+class ConcurrentClaimTests(TransactionTestCase):
+
+    def test_concurrent_claims_get_different_jobs(self):
+        washers = [EmployeesModel.objects.create_user(f"washer{i}", 100, False, "pass1234") for i in range(8)]
+        customer = Customer.objects.create(email="c@example.com", first_name="C", last_name="X")
+        jobs = {CarWashService.objects.create(customer=customer).pk for _ in range(20)}
+        barrier = threading.Barrier(len(washers))
+
+        def claim_all(washer):
+            claimed = []
+            try:
+                barrier.wait()
+                while (service := CarWashService.claim_next(washer.pk)) is not None:
+                    claimed.append(service.pk)
+            finally:
+                connections.close_all()
+            return claimed
+
+        with ThreadPoolExecutor(len(washers)) as pool:
+            claimed = [pk for pks in pool.map(claim_all, washers) for pk in pks]
+        self.assertEqual(sorted(claimed), sorted(jobs))
+        self.assertEqual(dict(DailySalesRollup.objects.order_by().values("status").annotate(total=Sum("count"))
+                              .values_list("status", "total")), {"pending": 0, "in_progress": 20})
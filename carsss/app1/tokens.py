@@ -0,0 +1,148 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer, TokenVerifySerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken, UntypedToken
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+
+from . import metrics
+from .models import Customer
+
+# Blacklist checks for refresh tokens go through Django's cache before the
+# token_blacklist tables. Blacklisting writes through to the cache, and entries
+# expire with the token, capped at SIMPLE_JWT["REFRESH_TOKEN_LIFETIME"].
+# "Not blacklisted" answers are only cached for JWT_BLACKLIST_NEGATIVE_TTL seconds,
+# because another worker with its own local cache could blacklist the token meanwhile.
+
+BLACKLISTED = "1"
+NOT_BLACKLISTED = "0"
+
+# Customer tokens carry the customer's id in this claim and no USER_ID_CLAIM, so
+# they can never be taken for the employee that happens to share the id
+CUSTOMER_ID_CLAIM = "customer_id"
+
+
+def _cache_key(jti):
+    return f"jwt-blacklist:{jti}"
+
+
+def _remaining_lifetime(token):
+    """Seconds until ``token`` expires, capped by the refresh token lifetime."""
+    lifetime = int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+    remaining = int(token["exp"] - token.current_time.timestamp())
+    return max(1, min(lifetime, remaining))
+
+
+def is_blacklisted(token):
+    jti = token[api_settings.JTI_CLAIM]
+    state = cache.get(_cache_key(jti))
+    if state is not None:
+        metrics.TOKEN_BLACKLIST.inc(operation="check_cached")
+        return state == BLACKLISTED
+    metrics.TOKEN_BLACKLIST.inc(operation="check_db")
+    blacklisted = BlacklistedToken.objects.filter(token__jti=jti).exists()
+    if blacklisted:
+        cache.set(_cache_key(jti), BLACKLISTED, _remaining_lifetime(token))
+    elif settings.JWT_BLACKLIST_NEGATIVE_TTL:
+        cache.set(_cache_key(jti), NOT_BLACKLISTED, settings.JWT_BLACKLIST_NEGATIVE_TTL)
+    return blacklisted
+
+
+def mark_blacklisted(token):
+    cache.set(_cache_key(token[api_settings.JTI_CLAIM]), BLACKLISTED, _remaining_lifetime(token))
+
+
+class CachedRefreshToken(RefreshToken):
+    """Refresh token whose blacklist check is answered from the cache when possible."""
+
+    def check_blacklist(self):
+        if is_blacklisted(self):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        blacklisted = super().blacklist()
+        mark_blacklisted(self)
+        metrics.TOKEN_BLACKLIST.inc(operation="blacklist")
+        return blacklisted
+
+
+class CachedTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refreshes employee tokens only.
+
+    simplejwt looks the user up with get(), so a token whose user_id matches no
+    employee failed with a 500; it is refused with a 401 here, like customer
+    tokens, which have no user_id at all. The is_admin claim is read again from
+    the employee rather than copied from the refresh token.
+    """
+    token_class = CachedRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        user = None
+        if user_id is not None and CUSTOMER_ID_CLAIM not in refresh:
+            user = get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+
+        # From the employee row, so a demoted admin's next access token drops the role
+        refresh["is_admin"] = user.is_admin
+        data = {"access": str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data["refresh"] = str(refresh)
+        return data
+
+
+# Unlike simplejwt's verify, a logged-out refresh token is always reported invalid
+class CachedTokenVerifySerializer(TokenVerifySerializer):
+
+    def validate(self, attrs):
+        token = UntypedToken(attrs["token"])
+        if is_blacklisted(token):
+            raise ValidationError(_("Token is blacklisted"))
+        return {}
+
+
+class EmployeeTokenMixin:
+    """Refuses customer tokens: only employee tokens authenticate API requests."""
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if CUSTOMER_ID_CLAIM in validated_token:
+            raise InvalidToken(_("Customer tokens cannot authenticate as an employee"))
+        return validated_token
+
+
+class EmployeeJWTAuthentication(EmployeeTokenMixin, JWTAuthentication):
+    pass
+
+
+class EmployeeJWTStatelessUserAuthentication(EmployeeTokenMixin, JWTStatelessUserAuthentication):
+    pass
+
+
+class CustomerJWTAuthentication(JWTAuthentication):
+    """Authenticates customer tokens only, as the Customer they were issued to."""
+
+    def get_user(self, validated_token):
+        customer_id = validated_token.get(CUSTOMER_ID_CLAIM)
+        if customer_id is None:
+            raise InvalidToken(_("Token contained no recognizable customer identification"))
+        try:
+            customer = Customer.objects.get(pk=customer_id)
+        except Customer.DoesNotExist as e:
+            raise AuthenticationFailed(_("Customer not found"), code="user_not_found") from e
+        if not customer.is_active:
+            raise AuthenticationFailed(_("Customer is inactive"), code="user_inactive")
+        return customer
@@ -1,27 +1,41 @@
+from django.conf import settings
 from django.urls import path
-from .views import EmpRegisterView,EmployeeLoginView,EmployeeAPIView,EmployeeLogoutView,AboutUs,SocialLinks,ReviewAPI
-from .views import CustomerRegisterView, CustomerLoginView,CustomerAPI,CarWashServiceView,ServicesCountAPIView, CustomerLogoutView 
+from rest_framework_simplejwt.views import TokenRefreshView, TokenVerifyView
+from . import async_views, views
+from .views import EmployeeLogoutView,AboutUs,SocialLinks,ReviewSummaryAPI
+from .views import ClaimServiceView, ServicesCountAPIView, LeaderboardAPIView, SalesSeriesAPIView, CustomerLogoutView, CustomerImportView
+
+# Login, registration and the CRUD endpoints run as native async views under ASGI
+# (settings.ASYNC_VIEWS)
+endpoint_views = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
 
- path('empRegister/', EmpRegisterView.as_view(), name='empRegister'),
- path('employeeLogin/', EmployeeLoginView.as_view(), name='employeeLogin'),
+ path('empRegister/', endpoint_views.EmpRegisterView.as_view(), name='empRegister'),
+ path('employeeLogin/', endpoint_views.EmployeeLoginView.as_view(), name='employeeLogin'),
  path('employeeLogout/', EmployeeLogoutView.as_view(), name='employeeLogout'),
- path('employeeAPI/', EmployeeAPIView.as_view(), name='employee'),
- path('employeeAPI/<int:pk>/', EmployeeAPIView.as_view(), name='employeeAPI'),
+ path('token/refresh/', TokenRefreshView.as_view(), name='tokenRefresh'),
+ path('token/verify/', TokenVerifyView.as_view(), name='tokenVerify'),
+ path('employeeAPI/', endpoint_views.EmployeeAPIView.as_view(), name='employee'),
+ path('employeeAPI/<int:pk>/', endpoint_views.EmployeeAPIView.as_view(), name='employeeAPI'),
 
- path('customerRegister/', CustomerRegisterView.as_view(), name='customerRegister'),
- path('customerLogin/', CustomerLoginView.as_view(), name='customerLogin'),
+ path('customerRegister/', endpoint_views.CustomerRegisterView.as_view(), name='customerRegister'),
+ path('customerLogin/', endpoint_views.CustomerLoginView.as_view(), name='customerLogin'),
  path('customerLogout/', CustomerLogoutView.as_view(), name='customerLogout'),
- path('customerAPI/',CustomerAPI.as_view(),name='customer'),
- path('customerAPI/<int:pk>/', CustomerAPI.as_view(), name='CustomerAPI'),
+ path('customerAPI/',endpoint_views.CustomerAPI.as_view(),name='customer'),
+ path('customerAPI/<int:pk>/', endpoint_views.CustomerAPI.as_view(), name='CustomerAPI'),
+ path('customerAPI/import/', CustomerImportView.as_view(), name='customerImport'),
 
 
- path('carWashService/',CarWashServiceView.as_view(),name='carWashService'), 
+ path('carWashService/',endpoint_views.CarWashServiceView.as_view(),name='carWashService'), 
+ path('carWashService/claim/',ClaimServiceView.as_view(),name='claimService'),
  path('servicesCount/',ServicesCountAPIView.as_view(),name='servicesCount'),
+ path('leaderboard/',LeaderboardAPIView.as_view(),name='leaderboard'),
+ path('salesSeries/',SalesSeriesAPIView.as_view(),name='salesSeries'),
 
  path('about_us/',AboutUs.as_view(),name='about_us'),
  path('social_links/',SocialLinks.as_view(),name='social_links'),
 
- path('review/',ReviewAPI.as_view(),name="review")
+ path('review/',endpoint_views.ReviewAPI.as_view(),name="review"),
+ path('review/summary/',ReviewSummaryAPI.as_view(),name="reviewSummary"),
 ]
@@ -0,0 +1,48 @@
+import hashlib
+import json
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+from rest_framework.renderers import JSONRenderer
+
+
+def parse_request_data(request):
+    """Body of a plain Django request: parsed JSON, or the form fields otherwise.
+
+    Raises ValueError on malformed JSON.
+    """
+    if request.content_type == "application/json":
+        return json.loads(request.body or b"{}")
+    return request.POST
+
+
+def json_response(data, status=200, renderer_class=JSONRenderer):
+    """JSON response rendered exactly like a DRF Response would be."""
+    return HttpResponse(renderer_class().render(data), content_type="application/json", status=status)
+
+
+class StaticResponse:
+    """A constant response whose body and headers are built once.
+
+    Calling it with a request replays the response (or a 304 when the client's
+    ``If-None-Match`` matches) without rendering anything.
+    """
+
+    def __init__(self, content=b"", status=200, content_type="text/html; charset=utf-8",
+                 max_age=86400, headers=None):
+        self.content = content.encode() if isinstance(content, str) else content
+        self.status = status
+        self.content_type = content_type
+        self.headers = dict(headers or {})
+        digest = hashlib.md5(self.content + repr(sorted(self.headers.items())).encode()).hexdigest()
+        self.headers["ETag"] = quote_etag(digest)
+        self.headers["Cache-Control"] = f"public, max-age={max_age}"
+
+    def __call__(self, request):
+        if self.headers["ETag"] in parse_etags(request.headers.get("If-None-Match", "")):
+            response = HttpResponseNotModified()
+            response["ETag"] = self.headers["ETag"]
+            response["Cache-Control"] = self.headers["Cache-Control"]
+            return response
+        return HttpResponse(self.content, status=self.status, content_type=self.content_type,
+                            headers=self.headers)
@@ -1,37 +1,79 @@
 # Standard library imports
+import io
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db import transaction
 from django.db.models import Q
 from django.contrib.auth import authenticate
-from django.contrib.auth.hashers import check_password
-from django.shortcuts import render, get_object_or_404, HttpResponse, redirect,HttpResponseRedirect
+from django.contrib.auth.hashers import check_password, make_password
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 
 # Third-party imports
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken  # token
 from rest_framework_simplejwt.exceptions import TokenError
-from rest_framework.exceptions import ValidationError, NotFound
-from rest_framework.pagination import PageNumberPagination
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+from rest_framework.parsers import MultiPartParser
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
 
 # Local imports
-from .models import EmployeesModel, Customer, CarWashService,Reviewmodel
+from . import metrics
+from .importers import FORMATS, detect_format, import_customers, read_rows
+from .middleware import timed
+from .models import EmployeesModel, Customer, CarWashService, DailySalesRollup, Reviewmodel, ReviewSummary
+from .permissions import IsAdminEmployee
+from .renderers import FastJSONRenderer
+from .response_cache import cached_response, invalidate
+from .routers import use_replica
+from .tokens import CUSTOMER_ID_CLAIM, CachedRefreshToken, CustomerJWTAuthentication  # token
+from .utils import StaticResponse, parse_request_data, json_response
 from .serializer import (
     EmployeeSerializer,EmployeeLoginSerializer,EmpManage,
     CustomerSerilizer,CustomerRegisterSerializer,CustomerLoginSerializer,
-    CarWashServiceSerializer,ReviewSerializer,
+    CarWashServiceSerializer,CarWashServiceBulkSerializer,ReviewSerializer,
 )
 
 
-# For token (access and refresh)
+# For token (access and refresh); the is_admin claim lets IsAdminEmployee
+# authorize without loading the employee when JWT_STATELESS_AUTH is on
 def get_tokens_for_user(user):
-    refresh = RefreshToken.for_user(user)
+    refresh = CachedRefreshToken.for_user(user)
+    refresh["is_admin"] = user.is_admin
     return {
         "refresh": str(refresh),
         "access": str(refresh.access_token),      
     }
 
 
+# Customers are not AUTH_USER_MODEL rows, so for_user() cannot record
+# their outstanding token; it is recorded here without a user instead. The id
+# goes in its own claim so the token never authenticates as an employee
+def get_refresh_token_for_customer(customer):
+    refresh = CachedRefreshToken()
+    refresh[CUSTOMER_ID_CLAIM] = customer.pk
+    OutstandingToken.objects.create(
+        jti=refresh[jwt_settings.JTI_CLAIM],
+        token=str(refresh),
+        created_at=refresh.current_time,
+        expires_at=datetime_from_epoch(refresh["exp"]),
+    )
+    return refresh
+
+
 # Employeee and admin 
 # Signup for employees
 class EmpRegisterView(APIView):
@@ -65,6 +107,7 @@ class EmployeeLoginView(APIView):
             # check if the username & password provided by the user exists or not  
             customer = authenticate(request, username=employee_name, password=password)
             if customer is not None:
+                metrics.LOGINS.inc(account="employee", result="success")
                 token = get_tokens_for_user(customer)
                 return Response(
                         {
@@ -73,6 +116,7 @@ class EmployeeLoginView(APIView):
                         }, 
                         status=status.HTTP_200_OK)      
             else:
+                metrics.LOGINS.inc(account="employee", result="failure")
                 return Response({
                             "error": {"non_field_error": ["Email or password is not valid"]}    
                         }, 
@@ -88,7 +132,7 @@ class EmployeeLogoutView(APIView):
     def post(self, request):
         try:
             refresh_token = request.data.get("refresh_token")
-            token = RefreshToken(refresh_token)
+            token = CachedRefreshToken(refresh_token)
             token.blacklist()
             return Response(
                 {"detail":"Successfully logged out."}, 
@@ -103,61 +147,44 @@ class EmployeeLogoutView(APIView):
 
 # Crud for emp if admin is true 
 class EmployeeAPIView(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsAdminEmployee]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
 
+    @cached_response("employees")
     def get(self,request):
-        if request.user.is_admin:  # Check if the current user is admin
-            emp = EmployeesModel.objects.all()
-            serilizer=EmployeeSerializer(emp,many=True)
-            return Response(serilizer.data)  # Returning data from(db) serialized data to user
-        return Response(
-                    {"detail": "Permission denied.(You are not admin)"},  # If user is not admin this will be printed
-                    status=status.HTTP_403_FORBIDDEN
-                    )
+        emp = EmployeeSerializer.project(EmployeesModel.objects.all())
+        with timed("serialize"):
+            data = EmployeeSerializer.represent(emp)
+        return Response(data)  # Returning data from(db) serialized data to user
 
     def post(self, request):
-        if request.user.is_admin:
-            serializer = EmployeeSerializer(data=request.data)
-            if serializer.is_valid():
-                serializer.save()
-                return Response(serializer.data, status=status.HTTP_201_CREATED)
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        return Response(
-                {"detail": "Permission denied.(You are not admin)"}, 
-                status=status.HTTP_403_FORBIDDEN
-                )
+        serializer = EmployeeSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     def put(self,request,pk):
-        if request.user.is_admin:
-            employee = get_object_or_404(EmployeesModel,pk=pk)
-            Serializer = EmpManage(employee,data=request.data,)  # if partial add partial=True after request.data
-            if Serializer.is_valid():
-                Serializer.save()
-                return Response(Serializer.data,status=status.HTTP_200_OK)
-            return Response(Serializer.errors,status=status.HTTP_400_BAD_REQUEST)
-        return Response(
-                    {"detail": "Permission denied.(You are not admin)"}, 
-                    status=status.HTTP_403_FORBIDDEN
-                    )
+        employee = get_object_or_404(EmployeesModel,pk=pk)
+        Serializer = EmpManage(employee,data=request.data,)  # if partial add partial=True after request.data
+        if Serializer.is_valid():
+            Serializer.save()
+            return Response(Serializer.data,status=status.HTTP_200_OK)
+        return Response(Serializer.errors,status=status.HTTP_400_BAD_REQUEST)
 
     def delete(self, request, pk):
-        if request.user.is_admin:
-            try:
-                employee = EmployeesModel.objects.get(pk=pk)
-                employee.delete()
-                return Response(
-                    {"detail": "Employee deleted."}, 
-                    status=status.HTTP_204_NO_CONTENT
-                    )
-            except EmployeesModel.DoesNotExist:
-                return Response(
-                    {"detail": "Employee not found."}, 
-                    status=status.HTTP_404_NOT_FOUND
-                    )
-        return Response(
-            {"detail": "Permission denied.(You are not admin)"}, 
-            status=status.HTTP_403_FORBIDDEN
-            )
+        try:
+            employee = EmployeesModel.objects.get(pk=pk)
+            employee.delete()
+            return Response(
+                {"detail": "Employee deleted."}, 
+                status=status.HTTP_204_NO_CONTENT
+                )
+        except EmployeesModel.DoesNotExist:
+            return Response(
+                {"detail": "Employee not found."}, 
+                status=status.HTTP_404_NOT_FOUND
+                )
 
 # Customer
 # Signup for customer
@@ -189,12 +216,19 @@ class CustomerLoginView(APIView):
             password = serializer.validated_data["password"]
             try:
                 customer = Customer.objects.get(email=email)
+
+                # Upgrade hashes made with an older hasher or cost on successful login
+                def rehash(raw_password):
+                    customer.password = make_password(raw_password)
+                    customer.save(update_fields=["password"])
+
                 # Check the password for the customer
-                if check_password(password, customer.password):
+                if check_password(password, customer.password, setter=rehash):
+                    metrics.LOGINS.inc(account="customer", result="success")
                     try:
                         employee = customer.employee  
                         # Generate JWT tokens for the customer
-                        refresh = RefreshToken.for_user(customer)
+                        refresh = get_refresh_token_for_customer(customer)
                         return Response(
                             {   "access": str(refresh.access_token),
                                 "refresh": str(refresh)},
@@ -206,11 +240,13 @@ class CustomerLoginView(APIView):
                             status=status.HTTP_400_BAD_REQUEST
                             )
                 else:
+                    metrics.LOGINS.inc(account="customer", result="failure")
                     return Response(
                         {"detail": "Invalid credentials."},
                           status=status.HTTP_400_BAD_REQUEST
                           )
             except Customer.DoesNotExist:
+                metrics.LOGINS.inc(account="customer", result="failure")
                 return Response(
                         {"detail": "Customer not found."}, 
                         status=status.HTTP_400_BAD_REQUEST
@@ -219,12 +255,13 @@ class CustomerLoginView(APIView):
 
 # Logout for customer
 class CustomerLogoutView(APIView):
+    authentication_classes = [CustomerJWTAuthentication]  # Customer tokens only
     permission_classes = [IsAuthenticated]  # Ensure the user is authenticated to log out
    
     def post(self, request):
         try:
             refresh_token = request.data.get("refresh_token")
-            token = RefreshToken(refresh_token)
+            token = CachedRefreshToken(refresh_token)
             token.blacklist()
             return Response(
                     {"detail": "Successfully logged out."}, 
@@ -238,164 +275,439 @@ class CustomerLogoutView(APIView):
 
 # Crud operation for Customer 
 class CustomerAPI(APIView):
-    permission_classes = [IsAuthenticated]  # Ensure that the user is authenticated
+    permission_classes = [IsAuthenticated, IsAdminEmployee]  # Only admin employees
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
    
+    @cached_response("customers")
     def get(self, request):
-        if request.user.is_admin:
-            try:
-                customer = Customer.objects.filter(Q(employee=request.user) | Q(employee__isnull=True))
-                serializer = CustomerSerilizer(customer,many=True)         
-                return Response(serializer.data, status=status.HTTP_200_OK)
-            except Customer.DoesNotExist:
-                return Response(
-                    {"detail": "Customer not found."}, 
-                    status=status.HTTP_404_NOT_FOUND
-                    )
-        return Response(
-            {"detail": "Permission denied.(you are not admin)"}, 
-            status=status.HTTP_403_FORBIDDEN
-            )
+        try:
+            customer = CustomerSerilizer.project(
+                Customer.objects.filter(Q(employee_id=request.user.id) | Q(employee__isnull=True)))
+            with timed("serialize"):
+                data = CustomerSerilizer.represent(customer)
+            return Response(data, status=status.HTTP_200_OK)
+        except Customer.DoesNotExist:
+            return Response(
+                {"detail": "Customer not found."}, 
+                status=status.HTTP_404_NOT_FOUND
+                )
         
     def post(self, request):
-        # Check if the current user is admin
-        if request.user.is_admin:
-            serializer = CustomerRegisterSerializer(data=request.data)
-            if serializer.is_valid():
-                serializer.save()
-                return Response(serializer.data, status=status.HTTP_201_CREATED)
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        return Response(
-            {"detail": "Permission denied.(you are not admin)"}, 
-            status=status.HTTP_403_FORBIDDEN
-            )
+        serializer = CustomerRegisterSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def put(self,request,pk):
-        if request.user.is_admin:
-            customer = get_object_or_404(Customer,pk=pk)
-            serializer = CustomerRegisterSerializer(customer,data=request.data)
-            if serializer.is_valid():
-                serializer.save()
-                return Response(serializer.data,status=status.HTTP_200_OK)
-            return Response(serializer.errors,status=status.HTTP_400_BAD_REQUEST)
-        return Response(
-            {"detail": "Permission denied.(you are not admin)"}, 
-            status=status.HTTP_403_FORBIDDEN
-            )
+        customer = get_object_or_404(Customer,pk=pk)
+        serializer = CustomerRegisterSerializer(customer,data=request.data)
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data,status=status.HTTP_200_OK)
+        return Response(serializer.errors,status=status.HTTP_400_BAD_REQUEST)
     
     def delete(self, request, pk):
-        if request.user.is_admin:
-            try:
-                customer = Customer.objects.get(pk=pk)
-                customer.delete()
-                return Response(
-                    {"detail": "customer deleted."}, 
-                    status=status.HTTP_204_NO_CONTENT
-                    )
-            except EmployeesModel.DoesNotExist:
-                return Response(
-                    {"detail": "customer not found."}, 
-                    status=status.HTTP_404_NOT_FOUND
-                    )
-        return Response(
-            {"detail": "Permission denied.(you are not admin)"}, 
-            status=status.HTTP_403_FORBIDDEN
-            )
+        try:
+            customer = Customer.objects.get(pk=pk)
+            customer.delete()
+            return Response(
+                {"detail": "customer deleted."}, 
+                status=status.HTTP_204_NO_CONTENT
+                )
+        except EmployeesModel.DoesNotExist:
+            return Response(
+                {"detail": "customer not found."}, 
+                status=status.HTTP_404_NOT_FOUND
+                )
+
+# Bulk customer import, the endpoint version of manage.py import_customers. Takes
+# a multipart "file", CSV or JSONL by its extension or ?file_format=; ?update=true
+# overwrites existing customers
+class CustomerImportView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminEmployee]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"file": ["No file was submitted."]}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.query_params.get("file_format") or detect_format(upload.name)
+        if file_format not in FORMATS:
+            return Response({"file_format": [f"Use one of: {', '.join(FORMATS)}."]},
+                            status=status.HTTP_400_BAD_REQUEST)
+        update_existing = request.query_params.get("update", "").lower() in ("1", "true")
+        stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+        # Own pool, so a large import does not queue ahead of logins on the shared one
+        with ThreadPoolExecutor(settings.PASSWORD_HASH_POOL_SIZE) as executor:
+            result = import_customers(read_rows(stream, file_format), executor=executor,
+                                      update_existing=update_existing)
+        return Response(result, status=status.HTTP_200_OK)
 
 # Services
+# Cursor pagination for service records, newest first
+class ServicePagination(CursorPagination):
+    """Keyset pagination on (service_date, id).
+
+    DRF's cursor only holds the first ordering field and steps over services
+    sharing a date with an OFFSET. Here the cursor holds the date and the id,
+    which is unique, so every page is a plain range scan of carwash_date_idx.
+    """
+    ordering = ("-service_date", "-id")
+    page_size_query_param = "page_size"  # Allow the client to specify page size
+    max_page_size = 500
+
+    def _get_position_from_instance(self, instance, ordering):
+        if isinstance(instance, dict):
+            return f"{instance['service_date'].isoformat()}|{instance['id']}"
+        return f"{instance.service_date.isoformat()}|{instance.id}"
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is not None and cursor.position is not None:
+            try:
+                service_date, pk = cursor.position.rsplit("|", 1)
+                position = (datetime.fromisoformat(service_date), int(pk))
+            except ValueError:
+                raise NotFound(self.invalid_cursor_message)
+            cursor = cursor._replace(position=position)
+        return cursor
+
+    def encode_cursor(self, cursor):
+        if isinstance(cursor.position, tuple):  # The position of the current cursor, reused
+            service_date, pk = cursor.position
+            cursor = cursor._replace(position=f"{service_date.isoformat()}|{pk}")
+        return super().encode_cursor(cursor)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # CursorPagination.paginate_queryset with a filter on both fields
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, current_position = self.cursor or (0, False, None)
+
+        queryset = queryset.order_by(*(_reverse_ordering(self.ordering) if reverse else self.ordering))
+        if current_position is not None:
+            service_date, pk = current_position
+            if reverse:  # Towards newer services
+                queryset = queryset.filter(Q(service_date__gte=service_date),
+                                           Q(service_date__gt=service_date) | Q(id__gt=pk))
+            else:
+                queryset = queryset.filter(Q(service_date__lte=service_date),
+                                           Q(service_date__lt=service_date) | Q(id__lt=pk))
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following_position = len(results) > len(self.page)
+        following_position = None
+        if has_following_position:
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following_position
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position = following_position
+            self.previous_position = current_position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+
+def wants_stream(request):
+    """True when the client asked for the NDJSON export (``?stream=true``)."""
+    return request.query_params.get("stream", "").lower() in ("1", "true", "ndjson")
+
+
+def stream_services(services, header=None, chunk_size=2000):
+    """Stream services as NDJSON rows read off a server-side cursor."""
+    serializer = CarWashServiceSerializer()
+    encoder = JSONEncoder(separators=(",", ":"))
+
+    services = services.using(services.db)  # Keep the database chosen inside the view
+
+    def rows():
+        if header is not None:
+            yield encoder.encode(header) + "\n"
+        ordered = services.order_by(*ServicePagination.ordering)
+        for service in ordered.iterator(chunk_size=chunk_size):
+            yield encoder.encode(serializer.to_representation(service)) + "\n"
+
+    return StreamingHttpResponse(rows(), content_type="application/x-ndjson")
+
+
 # Making services record here
 class CarWashServiceView(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsAdminEmployee]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
     
+    @cached_response("services")
+    @use_replica
     def get(self,request):
-        if request.user.is_admin:    
-            empid = request.user.id
-            empid = request.query_params.get("empid", None)
-            if empid :
-                services = CarWashService.objects.filter(employee__employee_name=empid)
-                serializer=CarWashServiceSerializer(services,many=True)
-                return Response(serializer.data,status=status.HTTP_200_OK)
-            else:
-                services = CarWashService.objects.all()
-            serializer = CarWashServiceSerializer(services, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        return Response(
-            {"detail": "Permission denied.(You are not admin)"}, 
-            status=status.HTTP_403_FORBIDDEN
-            )
+        empid = request.query_params.get("empid", None)
+        if empid :
+            services = CarWashService.objects.filter(employee__employee_name=empid)
+        else:
+            services = CarWashService.objects.all()
+        if wants_stream(request):
+            return stream_services(CarWashServiceSerializer.setup_eager_loading(services))
+        paginator = ServicePagination()
+        page = paginator.paginate_queryset(CarWashServiceSerializer.project(services), request, view=self)
+        with timed("serialize"):
+            data = CarWashServiceSerializer.represent(page)
+        return paginator.get_paginated_response(data)
 
     def post(self, request):
-        if request.user.is_admin:
-            serializer = CarWashServiceSerializer(data=request.data)
-            if serializer.is_valid():
-                service = serializer.save() 
-                return Response(
-                        {"message": "Car wash service created successfully!", 
-                            "id": service.id},
-                            status=status.HTTP_201_CREATED )
+        if isinstance(request.data, list):  # End-of-shift batch upload
+            return self.bulk_create(request)
+        serializer = CarWashServiceSerializer(data=request.data)
+        if serializer.is_valid():
+            service = serializer.save() 
+            return Response(
+                    {"message": "Car wash service created successfully!", 
+                        "id": service.id},
+                        status=status.HTTP_201_CREATED )
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    BULK_MAX_ITEMS = 1000  # Largest batch accepted in one request
 
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    def bulk_create(self, request):
+        """Create a list of services with one INSERT; nothing is saved if any item is invalid."""
+        errors, services = save_service_batch(request.data, self.BULK_MAX_ITEMS)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
         return Response(
-            {"detail": "Permission denied.(You are not admin)"},
-              status=status.HTTP_403_FORBIDDEN
-              )
+                {"message": "Car wash services created successfully!",
+                    "ids": [service.id for service in services]},
+                    status=status.HTTP_201_CREATED )
     
+
+def save_service_batch(data, max_items):
+    """Validate a list of service records and create them all with one INSERT.
+
+    Returns ``(errors, services)``. ``errors`` is keyed by the index of each failing
+    item, and when it is not empty nothing has been saved.
+    """
+    serializer = CarWashServiceBulkSerializer(
+        data=data, many=True, allow_empty=False, max_length=max_items)
+    if not serializer.is_valid():
+        errors = serializer.errors
+        if isinstance(errors, list):  # One entry per item, empty for the valid ones
+            errors = {index: error for index, error in enumerate(errors) if error}
+        return errors, []
+    records = serializer.validated_data
+
+    # Resolve every referenced employee and customer with one IN query each;
+    # records without an employee are unassigned jobs
+    employee_ids = set(EmployeesModel.objects.filter(
+        pk__in={record.get("employee") for record in records} - {None}).values_list("pk", flat=True))
+    customer_ids = set(Customer.objects.filter(
+        pk__in={record["customer"] for record in records}).values_list("pk", flat=True))
+    does_not_exist = PrimaryKeyRelatedField.default_error_messages["does_not_exist"]
+    errors = {}  # Keyed by the index of the failing item
+    for index, record in enumerate(records):
+        error = {}
+        if record.get("employee") is not None and record["employee"] not in employee_ids:
+            error["employee"] = [does_not_exist.format(pk_value=record["employee"])]
+        if record["customer"] not in customer_ids:
+            error["customer"] = [does_not_exist.format(pk_value=record["customer"])]
+        if error:
+            errors[index] = error
+    if errors:
+        return errors, []
+
+    with transaction.atomic():
+        services = CarWashService.objects.bulk_create(
+            CarWashService(
+                service_type=record["service_type"],
+                employee_id=record.get("employee"),
+                customer_id=record["customer"],
+                status=record["status"],
+            )
+            for record in records
+        )
+        # bulk_create skips the post_save signals, so count the batch here
+        DailySalesRollup.record_services(services)
+    invalidate("services")
+    return {}, services
+
+
+# Work queue: an employee takes the oldest pending job; concurrent claims skip
+# each other's locked rows, so no job is handed out twice
+class ClaimServiceView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        service = CarWashService.claim_next(request.user.id)
+        if service is None:
+            return Response(status=status.HTTP_204_NO_CONTENT)  # Nothing pending
+        return Response(CarWashServiceSerializer(service).data, status=status.HTTP_200_OK)
+
+
 # Sales count
 class ServicesCountAPIView(APIView):
-    permission_classes=[IsAuthenticated]  # Ensure that the user is authenticated
+    permission_classes=[IsAuthenticated, IsAdminEmployee]  # Only admin employees
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
 
+    @use_replica
     def post(self, request):
-        if request.user.is_admin:    
-            period = request.data.get("period", "today")  #Weekly Sale
-            try:
-                services = CarWashService.count_services_by_period(period) 
-                count_today = services.count()
-
-                total_earnings = sum(service.price for service in services)
-                serializer=CarWashServiceSerializer(services,many=True)
-            except ValueError as e:
-                raise ValidationError(str(e))   # Will return a 400 error with the message
-            # Return the count and period in the response
-            response_data = {
-                'count': count_today,
-                "total_earnings":total_earnings,
-                'services': serializer.data,
-            }
-
-            return Response(response_data)
-        return Response(
-            {"detail": "Permission denied.(You are not admin)"},
-              status=status.HTTP_403_FORBIDDEN
-              )
+        period = request.data.get("period", "today")  #Weekly Sale
+        try:
+            # Count and earnings come from the daily rollup, not the services table
+            totals = DailySalesRollup.totals(*CarWashService.period_days(period))
+            services = CarWashService.count_services_by_period(period)
+            count_today = totals["count"]
+            total_earnings = totals["total_earnings"]
+        except ValueError as e:
+            raise ValidationError(str(e))   # Will return a 400 error with the message
+        if wants_stream(request):
+            # First line carries the totals, every following line is one service
+            return stream_services(CarWashServiceSerializer.setup_eager_loading(services),
+                                   header={"count": count_today, "total_earnings": total_earnings})
+        paginator = ServicePagination()
+        page = paginator.paginate_queryset(CarWashServiceSerializer.project(services), request, view=self)
+        with timed("serialize"):
+            data = CarWashServiceSerializer.represent(page)
+        # Return the count and period in the response
+        response_data = {
+            'count': count_today,
+            "total_earnings":total_earnings,
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+            'services': data,
+        }
+
+        return Response(response_data)
     
+def requested_days(params, default_period="today"):
+    """First and last day (inclusive) asked for with ``start_date`` and ``end_date``
+    (YYYY-MM-DD) or with a ``period`` of ``CarWashService.period_days``."""
+    if "start_date" in params or "end_date" in params:
+        try:
+            start_day = date.fromisoformat(params.get("start_date", ""))
+            end_day = date.fromisoformat(params.get("end_date", ""))
+        except ValueError:
+            raise ValidationError("start_date and end_date must both be given as YYYY-MM-DD.")
+        if start_day > end_day:
+            raise ValidationError("start_date must not be after end_date.")
+        return start_day, end_day
+    try:
+        return CarWashService.period_days(params.get("period", default_period))
+    except ValueError as e:
+        raise ValidationError(str(e))
+
+
+# Employee leaderboard: services and revenue per employee over a period or date
+# range, ranked by revenue; one grouped query on the daily rollup
+class LeaderboardAPIView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminEmployee]  # Only admin employees
+
+    @cached_response("services", "employees")
+    @use_replica
+    def get(self, request):
+        start_day, end_day = requested_days(request.query_params)
+        service_status = request.query_params.get("status")
+        if service_status and service_status not in dict(CarWashService._meta.get_field("status").choices):
+            raise ValidationError(f"Unsupported status '{service_status}'.")
+        rows = DailySalesRollup.leaderboard(start_day, end_day, service_status)
+        return Response({
+            "start_date": start_day,
+            "end_date": end_day,
+            "employees": [
+                {"rank": row["rank"], "employee_id": row["id"], "employee_name": row["employee_name"],
+                 "count": row["count"], "revenue": row["revenue"]}
+                for row in rows
+            ],
+        })
+
+
+# Sales time series for the dashboard charts: count and revenue per hour, day, week
+# or month as parallel arrays, with empty buckets filled with zeros
+class SalesSeriesAPIView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminEmployee]  # Only admin employees
+    MAX_BUCKETS = 2000  # A year of days fits; a year of hours does not
+
+    @cached_response("services")
+    @use_replica
+    def get(self, request):
+        start_day, end_day = requested_days(request.query_params, default_period="this_month")
+        interval = request.query_params.get("interval", "day")
+        if interval not in DailySalesRollup.SERIES_INTERVALS:
+            raise ValidationError(f"Unsupported interval '{interval}'.")
+        service_status = request.query_params.get("status")
+        if service_status and service_status not in dict(CarWashService._meta.get_field("status").choices):
+            raise ValidationError(f"Unsupported status '{service_status}'.")
+        employee_id = request.query_params.get("employee")
+        if employee_id is not None and not employee_id.isdigit():
+            raise ValidationError("employee must be an employee id.")
+
+        buckets = []
+        for bucket in DailySalesRollup.series_buckets(interval, start_day, end_day):
+            if len(buckets) == self.MAX_BUCKETS:
+                raise ValidationError(
+                    f"More than {self.MAX_BUCKETS} {interval} buckets; use a shorter range or a longer interval.")
+            buckets.append(bucket)
+        totals = DailySalesRollup.series(interval, start_day, end_day,
+                                         employee_id=employee_id and int(employee_id), status=service_status)
+        counts, revenues = zip(*(totals.get(bucket, (0, 0)) for bucket in buckets)) if buckets else ((), ())
+        return Response({
+            "interval": interval,
+            "start_date": start_day,
+            "end_date": end_day,
+            "buckets": buckets,
+            "count": counts,
+            "revenue": revenues,
+        })
+
 # About_Us
-class AboutUs(APIView):
-    permission_classes=[AllowAny]
-    
-    def get(self,request):
-        return HttpResponse("Carsss is a leading car wash company dedicated to providing top-notch vehicle cleaning services. With a focus on quality, convenience, and customer satisfaction, \n we have \n Full Carwash: \n Inside Vacuum: \n Only Body: \n Full with Polish: \n Only Polish: ")
+# Public constant pages; plain Django views replaying prebuilt responses, so
+# they skip DRF's authentication and content negotiation entirely
+class AboutUs(View):
+    RESPONSE = StaticResponse("Carsss is a leading car wash company dedicated to providing top-notch vehicle cleaning services. With a focus on quality, convenience, and customer satisfaction, \n we have \n Full Carwash: \n Inside Vacuum: \n Only Body: \n Full with Polish: \n Only Polish: ")
 
-# Sociallinks
-class SocialLinks(APIView):
-    permission_classes = [AllowAny]
+    def get(self, request):
+        return self.RESPONSE(request)
+
+# Sociallinks; GET /social_links/?name=<platform> is the cacheable form, POST is kept for old clients
+@method_decorator(csrf_exempt, name="dispatch")
+class SocialLinks(View):
     PLATFORM_REDIRECTS = {
             "facebook": "https://www.facebook.com/login.php/",
             "youtube": "https://www.youtube.com/",
             "instagram": "https://www.instagram.com/accounts/login/",
             "twitter": "https://www.twitter.com/login",
         }
-    
-    def post(self, request):
-        platform_name = request.data.get("name")
-        redirect_url = self.PLATFORM_REDIRECTS.get(platform_name)
-        if redirect_url:
-            return redirect(redirect_url)
-        else:
-            return Response(
-                {"error": "Platform not supported"}, 
-                status=status.HTTP_400_BAD_REQUEST
-                )
+    REDIRECTS = {
+        platform_name: StaticResponse(status=302, headers={"Location": url})
+        for platform_name, url in PLATFORM_REDIRECTS.items()
+    }
+    UNSUPPORTED = StaticResponse(
+        JSONRenderer().render({"error": "Platform not supported"}),
+        status=400, content_type="application/json", max_age=3600,
+    )
+
+    def get(self, request):
+        return self.REDIRECTS.get(request.GET.get("name"), self.UNSUPPORTED)(request)
 
-class ReviewPagination(PageNumberPagination):
+    def post(self, request):
+        try:
+            platform_name = parse_request_data(request).get("name")
+        except ValueError as e:
+            return json_response({"detail": f"JSON parse error - {e}"}, status=400)
+        return self.REDIRECTS.get(platform_name, self.UNSUPPORTED)(request)
+
+# Keyset pagination on the primary key: no COUNT(*), no OFFSET scans, stable order
+class ReviewPagination(CursorPagination):
+    ordering = "-id"
     page_size = 2 # Number of reviews per page
     page_size_query_param = 'page_size'  # Allow the client to specify page size
     max_page_size = 3  # Limit the maximum page size
@@ -404,13 +716,16 @@ class ReviewPagination(PageNumberPagination):
 class ReviewAPI(APIView):
     permission_classes= [IsAuthenticated]
 
+    @use_replica
     def get(self, request):     
         reviews = Reviewmodel.objects.all()
         paginator = ReviewPagination()  # Create an instance of the custom pagination class
         paginated_reviews = paginator.paginate_queryset(reviews, request)  # Apply pagination to the queryset
 	    # Serialize the paginated data
         serializer = ReviewSerializer(paginated_reviews, many=True)
-        return paginator.get_paginated_response(serializer.data)  # Return paginated response
+        with timed("serialize"):
+            data = serializer.data
+        return paginator.get_paginated_response(data)  # Return paginated response
             
     def post(self,request):
         serializer = ReviewSerializer(data=request.data)
@@ -423,4 +738,19 @@ class ReviewAPI(APIView):
                         status=status.HTTP_201_CREATED
                         )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
\ No newline at end of file
+
+
+# Rating summary for the booking page widget; read from the counts the review
+# signals maintain, never recomputed from the reviews table
+class ReviewSummaryAPI(APIView):
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    @cached_response("reviews")
+    def get(self, request):
+        summary = ReviewSummary.current()
+        return Response({
+            "count": summary.count,
+            "average": summary.average,
+            "histogram": summary.histogram,
+        })
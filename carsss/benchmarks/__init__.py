@@ -0,0 +1,46 @@
+"""Local benchmarks for the carsss project.
+
+Run them from the project directory (the one holding manage.py), e.g.::
+
+    python -m benchmarks.hashers
+
+Load benchmarks run against a seeded database::
+
+    python -m benchmarks.seed
+    python -m benchmarks.traffic --server wsgi --baseline benchmarks/baselines/main.json
+"""
+import os
+import statistics
+
+
+def configure(settings_module="carsss.settings"):
+    """Point Django at the project settings without starting the app registry."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    from django.conf import settings
+    return settings
+
+
+def setup(settings_module="carsss.settings"):
+    """Configure Django and load the apps, for benchmarks that touch the ORM."""
+    configure(settings_module)
+    import django
+    django.setup()
+
+
+def latency_summary(latencies, elapsed):
+    """Request count, throughput and latency percentiles (ms) for one run."""
+    latencies = sorted(latencies)
+
+    def percentile(fraction):
+        if not latencies:
+            return 0.0
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000, 3)
+
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+    }
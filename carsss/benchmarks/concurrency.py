@@ -0,0 +1,154 @@
+"""Requests per second and tail latency of the API under WSGI and under ASGI.
+
+Starts the project under each server in turn, logs in once, then keeps many
+concurrent clients requesting one endpoint for a fixed time. Under ASGI the
+endpoint is served by its async view (settings.ASYNC_VIEWS), under WSGI by the
+APIView, so this compares the two implementations at a concurrency where the
+sync thread pool is the limit::
+
+    python -m benchmarks.concurrency --clients 200 --seconds 20 \\
+        --employee admin1 --password secret
+    python -m benchmarks.concurrency --servers asgi --path "/api/user/customerAPI/"
+
+The default commands need gunicorn and uvicorn installed; pass --wsgi-command or
+--asgi-command to use other servers ({port} and {workers} are filled in). The
+server must reach the database configured by the DB_* settings.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shlex
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from benchmarks import latency_summary
+
+SERVER_COMMANDS = {
+    "wsgi": "gunicorn carsss.wsgi:application --bind 127.0.0.1:{port} --workers {workers} --threads 8",
+    "asgi": "uvicorn carsss.asgi:application --host 127.0.0.1 --port {port} --workers {workers} --lifespan off",
+}
+
+
+def wait_for_port(port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server did not listen on port {port} within {timeout:.0f}s")
+
+
+def login(port, employee, password):
+    """Access token for the employee, from the login endpoint of the running server."""
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}/api/user/employeeLogin/",
+        data=json.dumps({"employee_name": employee, "password": password}).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)["token"]["access"]
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response; returns (status, keep_alive, body)."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    if "content-length" in headers:
+        body = await reader.readexactly(int(headers["content-length"]))
+        return status, headers.get("connection", "").lower() != "close", body
+    body = await reader.read()  # No length: the body runs to the end of the connection
+    return status, False, body
+
+
+async def client(port, request, deadline, latencies, errors):
+    """One client sending requests back to back until the deadline."""
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(request)
+            status, keep_alive, _ = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError):
+            errors["connection"] = errors.get("connection", 0) + 1
+            writer = None
+            continue
+        latencies.append(time.perf_counter() - start)
+        if status != 200:
+            errors[status] = errors.get(status, 0) + 1
+        if not keep_alive:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, path, token, clients, seconds):
+    request = (f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n"
+               f"Authorization: Bearer {token}\r\nAccept: application/json\r\n\r\n").encode()
+    latencies, errors = [], {}
+    start = time.perf_counter()
+    deadline = start + seconds
+    await asyncio.gather(*(client(port, request, deadline, latencies, errors) for _ in range(clients)))
+    result = latency_summary(latencies, time.perf_counter() - start)
+    result["errors"] = {str(key): count for key, count in errors.items()}
+    return result
+
+
+def run_server(mode, command, args):
+    """Start one server, load it and stop it; returns the load results."""
+    env = {**os.environ, "DJANGO_SERVER_MODE": mode}
+    argv = shlex.split(command.format(port=args.port, workers=args.workers))
+    server = subprocess.Popen(argv, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(args.port)
+        token = login(args.port, args.employee, args.password)
+        asyncio.run(load(args.port, args.path, token, args.clients, 2.0))  # Warm up
+        return asyncio.run(load(args.port, args.path, token, args.clients, args.seconds))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--servers", nargs="+", choices=SERVER_COMMANDS, default=list(SERVER_COMMANDS))
+    parser.add_argument("--wsgi-command", default=SERVER_COMMANDS["wsgi"])
+    parser.add_argument("--asgi-command", default=SERVER_COMMANDS["asgi"])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="server worker processes")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--path", default="/api/user/carWashService/?page_size=50", help="endpoint to load")
+    parser.add_argument("--clients", type=int, default=200, help="concurrent connections")
+    parser.add_argument("--seconds", type=float, default=15.0, help="length of each run")
+    parser.add_argument("--employee", default="admin1", help="admin employee to log in as")
+    parser.add_argument("--password", default="admin1234")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args(argv)
+
+    commands = {"wsgi": args.wsgi_command, "asgi": args.asgi_command}
+    results = {mode: run_server(mode, commands[mode], args) for mode in args.servers}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{args.clients} clients, {args.seconds:g}s, GET {args.path}")
+    print(f"{'server':<6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  errors")
+    for mode, r in results.items():
+        print(f"{mode:<6} {r['rps']:>9} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9}  {r['errors'] or '-'}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
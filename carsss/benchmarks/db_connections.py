@@ -0,0 +1,110 @@
+"""Request latency with per-request, persistent and pooled database connections.
+
+Each mode runs in its own process with the DB_* variables that select it, so the
+project settings are exercised exactly as a deployment would set them. Worker
+threads play the part of server threads: every simulated request fires Django's
+request_started and request_finished signals around one query, which is where
+Django opens, reuses, returns or closes connections::
+
+    python -m benchmarks.db_connections --threads 8 --requests 2000
+    DB_HOST=db.internal python -m benchmarks.db_connections --modes persistent pooled
+
+Needs a reachable Postgres (the DB_* settings) and, for the pooled mode,
+psycopg[pool].
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks import latency_summary, setup
+
+MODES = {
+    "per-request": {"DB_POOL": "false", "DB_CONN_MAX_AGE": "0"},
+    "persistent": {"DB_POOL": "false", "DB_CONN_MAX_AGE": "600"},
+    "pooled": {"DB_POOL": "true"},
+}
+
+
+def run_mode(threads, requests, query):
+    """Run the load in this process with whatever database settings it was started with."""
+    setup()
+    from django.core.signals import request_finished, request_started
+    from django.db import connection, connections
+    from django.db.backends.signals import connection_created
+
+    opened = []
+    connection_created.connect(lambda sender, connection, **kwargs: opened.append(1), weak=False)
+
+    def one_request():
+        start = time.perf_counter()
+        request_started.send(sender=None)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(query)
+                cursor.fetchall()
+        finally:
+            request_finished.send(sender=None)
+        return time.perf_counter() - start
+
+    latencies = []
+    lock = threading.Lock()
+    per_thread = requests // threads
+
+    def worker():
+        mine = [one_request() for _ in range(per_thread)]
+        connections.close_all()
+        with lock:
+            latencies.extend(mine)
+
+    one_request()  # Warm up imports (and the pool) outside the measurement
+    opened.clear()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    result = latency_summary(latencies, time.perf_counter() - start)
+    result["connections_opened"] = len(opened)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8, help="concurrent request threads")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per mode, split across threads")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--query", default="SELECT 1", help="SQL each request runs")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_mode(args.threads, args.requests, args.query)))
+        return
+
+    results = {}
+    for mode in args.modes:
+        env = {**os.environ, **MODES[mode]}
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.db_connections", "--child",
+             "--threads", str(args.threads), "--requests", str(args.requests), "--query", args.query],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'mode':<12} {'req/s':>9} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'conns':>7}")
+    for mode, r in results.items():
+        print(f"{mode:<12} {r['rps']:>9} {r['mean_ms']:>9} {r['p50_ms']:>9} "
+              f"{r['p95_ms']:>9} {r['p99_ms']:>9} {r['connections_opened']:>7}")
+
+
+if __name__ == "__main__":
+    main()
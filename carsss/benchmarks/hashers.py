@@ -0,0 +1,81 @@
+"""Login throughput of each configured password hasher.
+
+A login is one ``check_password`` against a stored hash, which is what
+EmployeeLoginView and CustomerLoginView spend their time on. For every entry of
+settings.PASSWORD_HASHERS this reports verifications per second on one core and,
+with ``--processes``, the total rate when that many cores hash at once::
+
+    python -m benchmarks.hashers --seconds 5 --processes 4
+    PASSWORD_HASHER=scrypt SCRYPT_WORK_FACTOR=32768 python -m benchmarks.hashers
+
+Hashers whose library is missing (argon2-cffi for Argon2) are skipped.
+"""
+import argparse
+import json
+import multiprocessing
+import time
+
+from benchmarks import configure
+
+
+def _verify_rate(hasher_path, seconds):
+    """Verifications per second of one hasher in the current process."""
+    configure()
+    from django.utils.module_loading import import_string
+
+    hasher = import_string(hasher_path)()
+    encoded = hasher.encode("correct horse battery staple", hasher.salt())
+    done = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        hasher.verify("correct horse battery staple", encoded)
+        done += 1
+    return done / (time.perf_counter() - start)
+
+
+def measure(hasher_path, seconds, processes):
+    """Return (per-core rate, total rate across ``processes`` workers)."""
+    per_core = _verify_rate(hasher_path, seconds)
+    if processes <= 1:
+        return per_core, per_core
+    with multiprocessing.Pool(processes) as pool:
+        rates = pool.starmap(_verify_rate, [(hasher_path, seconds)] * processes)
+    return per_core, sum(rates)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3.0, help="time spent on each measurement")
+    parser.add_argument("--processes", type=int, default=1, help="workers hashing in parallel")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args(argv)
+
+    settings = configure()
+    results = []
+    for path in settings.PASSWORD_HASHERS:
+        try:
+            per_core, total = measure(path, args.seconds, args.processes)
+        except ValueError as e:  # Hasher library not installed
+            results.append({"hasher": path, "skipped": str(e)})
+            continue
+        results.append({
+            "hasher": path,
+            "logins_per_sec_per_core": round(per_core, 1),
+            "logins_per_sec_total": round(total, 1),
+            "processes": args.processes,
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for result in results:
+        if "skipped" in result:
+            print(f"{result['hasher']:<45} skipped: {result['skipped']}")
+        else:
+            print(f"{result['hasher']:<45} {result['logins_per_sec_per_core']:>9.1f}/s per core"
+                  f" {result['logins_per_sec_total']:>9.1f}/s on {result['processes']} process(es)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Seed the database with a synthetic dataset for the load benchmarks.
+
+Creates employees, customers, services spread over the last --days days, and
+reviews, all bulk inserted::
+
+    python -m benchmarks.seed --employees 50 --customers 20000 --services 200000 --reviews 5000
+    python -m benchmarks.seed --reset
+
+Every seeded row is marked so --reset can remove it again: employees are named
+bench_admin and bench_emp<N>, customers use @bench.example.com addresses and
+reviews start with "[bench]". All accounts share --password, hashed once, so
+seeding does not spend its time in the password hasher. The bulk inserts bypass
+the model signals; the daily sales rollup and the review summary are rebuilt at
+the end and the cached responses invalidated.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import timedelta
+
+from benchmarks import setup
+
+EMPLOYEE_PREFIX = "bench_"
+CUSTOMER_DOMAIN = "@bench.example.com"
+REVIEW_PREFIX = "[bench]"
+ADMIN_NAME = "bench_admin"
+
+
+def reset():
+    """Delete every row an earlier seed created, with plain DELETEs instead of per-row signals."""
+    from django.db import connection, transaction
+    from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+    from app1.models import CarWashService, Customer, DailySalesRollup, EmployeesModel, Reviewmodel, ReviewSummary
+
+    services = CarWashService._meta.db_table
+    customers = Customer._meta.db_table
+    employees = EmployeesModel._meta.db_table
+    rollups = DailySalesRollup._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {services} WHERE customer_id IN (SELECT id FROM {customers} WHERE email LIKE %s)"
+            f" OR employee_id IN (SELECT id FROM {employees} WHERE employee_name LIKE %s)",
+            ["%" + CUSTOMER_DOMAIN, EMPLOYEE_PREFIX + "%"])
+        cursor.execute(f"DELETE FROM {customers} WHERE email LIKE %s", ["%" + CUSTOMER_DOMAIN])
+        cursor.execute(
+            f"DELETE FROM {rollups} WHERE employee_id IN (SELECT id FROM {employees} WHERE employee_name LIKE %s)",
+            [EMPLOYEE_PREFIX + "%"])
+        # Logins during a benchmark leave refresh tokens pointing at the employees;
+        # the ORM delete also removes their blacklist entries
+        OutstandingToken.objects.filter(user__employee_name__startswith=EMPLOYEE_PREFIX).delete()
+        cursor.execute(f"DELETE FROM {employees} WHERE employee_name LIKE %s", [EMPLOYEE_PREFIX + "%"])
+        cursor.execute(f"DELETE FROM {Reviewmodel._meta.db_table} WHERE review LIKE %s", [REVIEW_PREFIX + "%"])
+    DailySalesRollup.rebuild()
+    ReviewSummary.rebuild()
+
+
+def seed(employees, customers, services, reviews, days, password, rng, batch_size=2000, progress=print):
+    """Insert the dataset; returns the number of rows created per model."""
+    from django.contrib.auth.hashers import make_password
+    from django.db import transaction
+    from django.utils import timezone
+    from app1.models import CarWashService, Customer, DailySalesRollup, EmployeesModel, Reviewmodel, ReviewSummary
+    from app1.response_cache import invalidate
+
+    password_hash = make_password(password)
+    service_types = list(CarWashService.SERVICE_PRICE)
+    statuses = [value for value, _ in CarWashService._meta.get_field("status").choices]
+    now = timezone.now()
+
+    with transaction.atomic():
+        staff = EmployeesModel.objects.bulk_create(
+            [EmployeesModel(employee_name=ADMIN_NAME, salary=5000, is_admin=True, password=password_hash)]
+            + [EmployeesModel(employee_name=f"{EMPLOYEE_PREFIX}emp{i}", salary=rng.randrange(200, 2000),
+                              password=password_hash) for i in range(employees)],
+            batch_size=batch_size)
+        progress(f"employees: {len(staff)}")
+
+        clients = Customer.objects.bulk_create(
+            (Customer(email=f"customer{i}{CUSTOMER_DOMAIN}", first_name=f"First{i}", last_name=f"Last{i}",
+                      password=password_hash, employee=rng.choice(staff) if rng.random() < 0.5 else None)
+             for i in range(customers)),
+            batch_size=batch_size)
+        progress(f"customers: {len(clients)}")
+
+        # service_date is auto_now_add, so the spread-out dates are written in a second pass
+        created = CarWashService.objects.bulk_create(
+            (CarWashService(employee=rng.choice(staff), customer=rng.choice(clients),
+                            service_type=rng.choice(service_types), status=rng.choice(statuses))
+             for _ in range(services)),
+            batch_size=batch_size)
+        for service in created:
+            service.service_date = now - timedelta(seconds=rng.randrange(days * 86400))
+        CarWashService.objects.bulk_update(created, ["service_date"], batch_size=batch_size)
+        progress(f"services: {len(created)}")
+
+        written = Reviewmodel.objects.bulk_create(
+            (Reviewmodel(ratings=rng.choices(range(1, 6), weights=(1, 1, 2, 4, 6))[0],
+                         review=f"{REVIEW_PREFIX} Review {i}") for i in range(reviews)),
+            batch_size=batch_size)
+        progress(f"reviews: {len(written)}")
+
+        DailySalesRollup.rebuild()
+        ReviewSummary.rebuild()
+    invalidate("services", "customers", "employees", "reviews")
+    return {"employees": len(staff), "customers": len(clients), "services": len(created), "reviews": len(written)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--employees", type=int, default=20, help="employees besides bench_admin")
+    parser.add_argument("--customers", type=int, default=5000)
+    parser.add_argument("--services", type=int, default=50000)
+    parser.add_argument("--reviews", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=365, help="spread services over this many past days")
+    parser.add_argument("--password", default="bench1234", help="password of every seeded account")
+    parser.add_argument("--seed", type=int, default=1, help="random seed, for a repeatable dataset")
+    parser.add_argument("--reset", action="store_true", help="only delete previously seeded rows")
+    args = parser.parse_args(argv)
+
+    setup()
+    start = time.perf_counter()
+    reset()
+    if args.reset:
+        print(f"removed seeded rows in {time.perf_counter() - start:.1f}s")
+        return
+    counts = seed(args.employees, args.customers, args.services, args.reviews, args.days,
+                  args.password, random.Random(args.seed))
+    print(f"seeded {counts} in {time.perf_counter() - start:.1f}s; log in as {ADMIN_NAME} / {args.password}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
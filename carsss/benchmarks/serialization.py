@@ -0,0 +1,107 @@
+"""List serialization: ModelSerializer + JSONRenderer against the values() fast path.
+
+For the services, customers and employees lists this times fetching the rows,
+turning them into data and rendering the JSON, once through the ModelSerializers
+with JSONRenderer (the old list views) and once through the serializers'
+``project``/``represent`` methods with FastJSONRenderer (orjson when installed).
+Both must give the same bytes, which is checked on every run. Needs rows in the
+database (see benchmarks.seed)::
+
+    python -m benchmarks.seed --services 200000
+    python -m benchmarks.serialization --rows 10000 --repeat 7
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from benchmarks import setup
+
+
+def cases():
+    from app1.models import CarWashService, Customer, EmployeesModel
+    from app1.serializer import CarWashServiceSerializer, CustomerSerilizer, EmployeeSerializer
+
+    return {
+        "services": (CarWashService.objects.order_by("-service_date", "-id"), CarWashServiceSerializer,
+                     lambda queryset: queryset.only("id", "service_type", "employee", "customer", "status",
+                                                    "service_date")),
+        "customers": (Customer.objects.order_by("id"), CustomerSerilizer,
+                      lambda queryset: queryset.only("id", "email", "first_name", "last_name", "is_active")),
+        "employees": (EmployeesModel.objects.order_by("id"), EmployeeSerializer,
+                      lambda queryset: queryset.only("id", "employee_name", "salary", "is_admin", "password")),
+    }
+
+
+def timed_run(fetch, serialize, render):
+    """Milliseconds spent in each step, and the rendered bytes."""
+    times = {}
+    start = time.perf_counter()
+    rows = fetch()
+    times["fetch_ms"] = time.perf_counter() - start
+    start = time.perf_counter()
+    data = serialize(rows)
+    times["serialize_ms"] = time.perf_counter() - start
+    start = time.perf_counter()
+    content = render(data)
+    times["render_ms"] = time.perf_counter() - start
+    return {key: value * 1000 for key, value in times.items()}, content
+
+
+def measure(rows, repeat):
+    from rest_framework.renderers import JSONRenderer
+    from app1.renderers import FastJSONRenderer
+
+    results = {}
+    for name, (queryset, serializer_class, only) in cases().items():
+        queryset = queryset[:rows]
+        paths = {
+            "serializer": (lambda: list(only(queryset)),
+                           lambda rows: serializer_class(rows, many=True).data,
+                           JSONRenderer().render),
+            "projection": (lambda: list(serializer_class.project(queryset)),
+                           serializer_class.represent,
+                           FastJSONRenderer().render),
+        }
+        result = {}
+        contents = {}
+        for path, steps in paths.items():
+            runs = []
+            for _ in range(repeat):
+                times, contents[path] = timed_run(*steps)
+                runs.append(times)
+            result[path] = {key: round(statistics.median(run[key] for run in runs), 2) for key in runs[0]}
+            result[path]["total_ms"] = round(sum(result[path].values()), 2)
+        if contents["serializer"] != contents["projection"]:
+            raise AssertionError(f"{name}: the fast path rendered different bytes")
+        result["rows"] = len(json.loads(contents["projection"]))
+        result["bytes"] = len(contents["projection"])
+        result["speedup"] = round(result["serializer"]["total_ms"] / (result["projection"]["total_ms"] or 1e-9), 1)
+        results[name] = result
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000, help="rows per list")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per path; the median is reported")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args(argv)
+
+    setup()
+    results = measure(args.rows, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'list':<10} {'rows':>7} {'path':<11} {'fetch ms':>9} {'data ms':>9} {'render ms':>10} {'total ms':>9}")
+    for name, result in results.items():
+        for path in ("serializer", "projection"):
+            r = result[path]
+            print(f"{name:<10} {result['rows']:>7} {path:<11} {r['fetch_ms']:>9} {r['serialize_ms']:>9} "
+                  f"{r['render_ms']:>10} {r['total_ms']:>9}")
+        print(f"{'':<10} {'':>7} speedup {result['speedup']}x, {result['bytes']} bytes identical")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""Mixed API traffic against a local server, with saved baselines to catch regressions.
+
+Concurrent keep-alive clients each pick the next request from a weighted mix of
+logins, service listings, sales counts, customer listings and review reads and
+writes. Throughput and p50/p95/p99 latency are reported overall and per
+scenario. Seed the database first (benchmarks.seed), then::
+
+    python -m benchmarks.traffic --port 8000 --save benchmarks/baselines/main.json
+    python -m benchmarks.traffic --port 8000 --baseline benchmarks/baselines/main.json
+    python -m benchmarks.traffic --server asgi --mix services=50,customers=50
+
+With --baseline the run exits with status 1 if throughput fell, or p95 or p99
+latency rose, by more than --tolerance against the saved run, overall or for any
+scenario. Compare runs from the same machine, dataset and options only. With
+--server the project is started under gunicorn or uvicorn for the run (see
+benchmarks.concurrency); otherwise a server must already listen on --port.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shlex
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from benchmarks import latency_summary
+from benchmarks.concurrency import SERVER_COMMANDS, login, read_response, wait_for_port
+from benchmarks.seed import ADMIN_NAME, REVIEW_PREFIX
+
+API = "/api/user/"
+
+SERVICES_PAGES = 5  # Pages of the services list a client reads before starting from the top again
+
+# Scenario name -> (default weight, request builder); a builder returns (method, path, JSON body or None).
+# ``state`` is the client's own dict, kept across its requests.
+SCENARIOS = {
+    "login": (5, lambda rng, args, state: (
+        "POST", API + "employeeLogin/", {"employee_name": args.employee, "password": args.password})),
+    "services": (30, lambda rng, args, state: (
+        "GET", state.get("services_next") or API + "carWashService/", None)),
+    "services_count": (15, lambda rng, args, state: (
+        "POST", API + "servicesCount/", {"period": rng.choice(["today", "yesterday", "weekly", "this_month"])})),
+    "customers": (20, lambda rng, args, state: (
+        "GET", API + "customerAPI/", None)),
+    "reviews": (25, lambda rng, args, state: (
+        "GET", API + "review/", None)),
+    "review_post": (5, lambda rng, args, state: (
+        "POST", API + "review/", {"ratings": rng.randint(1, 5), "review": f"{REVIEW_PREFIX} Load test"})),
+}
+
+
+def follow_services_cursor(state, body):
+    """Keep the next page's link: the services list is cursor paginated, so a
+    client pages through it by following ``next`` rather than asking for ?page=N."""
+    pages = state.get("services_pages", 0) + 1
+    next_url = json.loads(body).get("next")
+    if next_url and pages < SERVICES_PAGES:
+        url = urlsplit(next_url)
+        state["services_next"], state["services_pages"] = f"{url.path}?{url.query}", pages
+    else:
+        state["services_next"], state["services_pages"] = None, 0
+
+
+def parse_mix(text):
+    """Weights from "name=weight,..."; scenarios left out are not sent."""
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def build_request(method, path, body, port, token):
+    headers = [f"{method} {path} HTTP/1.1", f"Host: 127.0.0.1:{port}", "Accept: application/json"]
+    if token:
+        headers.append(f"Authorization: Bearer {token}")
+    payload = b""
+    if body is not None:
+        payload = json.dumps(body).encode()
+        headers += ["Content-Type: application/json", f"Content-Length: {len(payload)}"]
+    return ("\r\n".join(headers) + "\r\n\r\n").encode() + payload
+
+
+async def client(rng, args, token, names, weights, deadline, samples):
+    """One client sending requests from the mix back to back until the deadline."""
+    reader = writer = None
+    state = {}
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        method, path, body = SCENARIOS[name][1](rng, args, state)
+        request = build_request(method, path, body, args.port, None if name == "login" else token)
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", args.port)
+            writer.write(request)
+            status, keep_alive, content = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError):
+            samples.append((name, None, "connection"))
+            writer = None
+            continue
+        samples.append((name, time.perf_counter() - start, status))
+        if name == "services":
+            follow_services_cursor(state, content if status == 200 else b"{}")
+        if not keep_alive:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def load(args, token, seconds):
+    """Run the mix for ``seconds``; returns the overall and per-scenario results."""
+    names, weights = zip(*args.mix.items())
+    samples = []
+    start = time.perf_counter()
+    deadline = start + seconds
+    await asyncio.gather(*(client(random.Random(args.seed + i), args, token, names, weights, deadline, samples)
+                           for i in range(args.clients)))
+    elapsed = time.perf_counter() - start
+
+    def summary(rows):
+        result = latency_summary([latency for _, latency, _ in rows if latency is not None], elapsed)
+        errors = {}
+        for _, _, status in rows:
+            if status == "connection" or status >= 400:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+        result["errors"] = errors
+        return result
+
+    return {
+        "overall": summary(samples),
+        "scenarios": {name: summary([row for row in samples if row[0] == name]) for name in names},
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of ``results`` against ``baseline``, as readable lines."""
+    regressions = []
+    current = {"overall": results["overall"], **results["scenarios"]}
+    saved = {"overall": baseline["overall"], **baseline["scenarios"]}
+    for name, before in saved.items():
+        after = current.get(name)
+        if after is None:
+            continue
+        if after["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: {after['rps']} req/s, baseline {before['rps']}")
+        for key in ("p95_ms", "p99_ms"):
+            if after[key] > before[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {after[key]}, baseline {before[key]}")
+    return regressions
+
+
+def run(args):
+    server = None
+    if args.server:
+        argv = shlex.split(SERVER_COMMANDS[args.server].format(port=args.port, workers=args.workers))
+        server = subprocess.Popen(argv, env={**os.environ, "DJANGO_SERVER_MODE": args.server},
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(args.port)
+        token = login(args.port, args.employee, args.password)
+        asyncio.run(load(args, token, min(args.seconds, 2.0)))  # Warm up
+        return asyncio.run(load(args, token, args.seconds))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--server", choices=SERVER_COMMANDS, help="start the project under this server")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes with --server")
+    parser.add_argument("--mix", type=parse_mix, default={name: weight for name, (weight, _) in SCENARIOS.items()},
+                        help="scenario weights, e.g. services=30,reviews=10 (default: all)")
+    parser.add_argument("--clients", type=int, default=50, help="concurrent connections")
+    parser.add_argument("--seconds", type=float, default=30.0, help="length of the measured run")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the request mix")
+    parser.add_argument("--employee", default=ADMIN_NAME, help="admin employee to log in as")
+    parser.add_argument("--password", default="bench1234")
+    parser.add_argument("--save", type=Path, help="write the results to this baseline file")
+    parser.add_argument("--baseline", type=Path, help="compare against this baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative change (0.10 = 10%%)")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args(argv)
+
+    results = {
+        "config": {"clients": args.clients, "seconds": args.seconds, "server": args.server, "mix": args.mix},
+        **run(args),
+    }
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(results, indent=2) + "\n")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{args.clients} clients, {args.seconds:g}s")
+        print(f"{'scenario':<15} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  errors")
+        for name, r in {"overall": results["overall"], **results["scenarios"]}.items():
+            print(f"{name:<15} {r['rps']:>9} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9}  {r['errors'] or '-'}")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,5 +12,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'carsss.settings')
+os.environ.setdefault('DJANGO_SERVER_MODE', 'asgi')  # Selects the async defaults in settings
 
 application = get_asgi_application()
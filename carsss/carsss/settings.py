@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import importlib.util
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -27,6 +29,12 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+# "wsgi" or "asgi"; carsss/asgi.py sets it so settings can pick per-server defaults
+SERVER_MODE = os.environ.get("DJANGO_SERVER_MODE", "wsgi")
+
+# Serve the endpoints that have native async versions (app1/async_views.py) with them
+ASYNC_VIEWS = os.environ.get("ASYNC_VIEWS", str(SERVER_MODE == "asgi")).lower() in ("1", "true", "yes")
+
 
 # Application definition
 
@@ -45,6 +53,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app1.middleware.PerformanceTimingMiddleware',  # Outermost, so it times everything below
+    'app1.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,6 +64,38 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-request timing (app1/middleware.py): Server-Timing header with SQL, serializer
+# and render time, one JSON log record per request on the "app1.performance" logger,
+# and the slowest queries of a PERF_SLOW_SAMPLE_RATE share of the requests slower
+# than PERF_SLOW_REQUEST_MS. Off by default; the middleware is then skipped entirely.
+PERF_TIMING = os.environ.get("PERF_TIMING", "false").lower() in ("1", "true", "yes")
+PERF_TIMING_HEADER = os.environ.get("PERF_TIMING_HEADER", "true").lower() in ("1", "true", "yes")
+PERF_SLOW_REQUEST_MS = float(os.environ.get("PERF_SLOW_REQUEST_MS", 500))
+PERF_SLOW_SAMPLE_RATE = float(os.environ.get("PERF_SLOW_SAMPLE_RATE", 1.0))
+
+# Request, SQL, login and token blacklist metrics (app1/metrics.py), scraped from
+# /metrics/ in the Prometheus text format. Set METRICS_MULTIPROC_DIR to a directory
+# shared by the worker processes (emptied on restart) when running several of them;
+# each writes its samples there every METRICS_FLUSH_INTERVAL seconds. Scrapes
+# must send METRICS_TOKEN as a bearer token; the endpoint is closed until it is set.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+METRICS_MULTIPROC_DIR = os.environ.get("METRICS_MULTIPROC_DIR", "")
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", 5))
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "app1.performance": {
+            "handlers": ["console"],
+            "level": os.environ.get("PERF_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
+
 ROOT_URLCONF = 'carsss.urls'
 
 TEMPLATES = [
@@ -78,17 +120,145 @@ WSGI_APPLICATION = 'carsss.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# PostgreSQL 15 or later (app1/checks.py). Connection details come from DB_*
+# variables; the defaults are the local development database. Persistent connections suit WSGI, where each worker
+# thread reuses its own. Under ASGI every request may run on a different thread,
+# so connections are closed after each request and borrowed from a psycopg3 pool
+# (pip install "psycopg[pool]") when it is installed. Pooling requires DB_CONN_MAX_AGE=0.
+
+DB_POOL = os.environ.get(
+    "DB_POOL", str(SERVER_MODE == "asgi" and importlib.util.find_spec("psycopg_pool") is not None),
+).lower() in ("1", "true", "yes")
+
 DATABASES = {
     'default': {
         "ENGINE": "django.db.backends.postgresql",
-        "NAME": "projects",
-        "USER": "postgres",
-        "PASSWORD": "root",
-        "HOST": "127.0.0.1",
-        "PORT": "5432",
+        "NAME": os.environ.get("DB_NAME", "projects"),
+        "USER": os.environ.get("DB_USER", "postgres"),
+        "PASSWORD": os.environ.get("DB_PASSWORD", "root"),
+        "HOST": os.environ.get("DB_HOST", "127.0.0.1"),
+        "PORT": os.environ.get("DB_PORT", "5432"),
+        # Seconds a connection is kept for reuse across requests (0 closes it every request)
+        "CONN_MAX_AGE": 0 if DB_POOL else int(os.environ.get("DB_CONN_MAX_AGE", 600 if SERVER_MODE == "wsgi" else 0)),
+        # Check a reused connection before a request relies on it
+        "CONN_HEALTH_CHECKS": os.environ.get("DB_CONN_HEALTH_CHECKS", "true").lower() in ("1", "true", "yes"),
+        "OPTIONS": {},
+    }
+    }
+
+if DB_POOL:
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+        "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+        # Seconds a request waits for a free connection before failing
+        "timeout": float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+    }
+
+# Read replica for the reporting endpoints (app1/routers.py). Set DB_REPLICA_HOST to
+# use it; without it the alias still exists (pointing at the primary) so tests can
+# route to it, but nothing reads from it. Tests run it as a mirror of "default".
+DATABASES["replica"] = {
+    **DATABASES["default"],
+    "HOST": os.environ.get("DB_REPLICA_HOST", DATABASES["default"]["HOST"]),
+    "PORT": os.environ.get("DB_REPLICA_PORT", DATABASES["default"]["PORT"]),
+    "OPTIONS": {key: dict(value) if isinstance(value, dict) else value
+                for key, value in DATABASES["default"]["OPTIONS"].items()},
+    "TEST": {"MIRROR": "default"},
+}
+DATABASE_REPLICA_ALIAS = "replica" if os.environ.get("DB_REPLICA_HOST") else None
+DATABASE_ROUTERS = ["app1.routers.ReplicaRouter"]
+
+
+# Cache
+# Local memory by default; set REDIS_URL to share the cache between workers.
+# "responses" holds rendered list responses (app1/response_cache.py): entries
+# expire after RESPONSE_CACHE_TIMEOUT seconds and the least recently used are
+# evicted past RESPONSE_CACHE_MAX_ENTRIES (with Redis, by its maxmemory policy).
+# "response_generations" holds one counter per data group, which must not be
+# evicted: it never culls in local memory, and its keys have no expiry, which
+# Redis's volatile-* and noeviction policies leave alone.
+
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get("RESPONSE_CACHE_TIMEOUT", 30))
+
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        },
+        "responses": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+            "KEY_PREFIX": "responses",
+            "TIMEOUT": RESPONSE_CACHE_TIMEOUT,
+        },
+        "response_generations": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+            "KEY_PREFIX": "response-generations",
+            "TIMEOUT": None,
+        },
     }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+        "responses": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "responses",
+            "TIMEOUT": RESPONSE_CACHE_TIMEOUT,
+            "OPTIONS": {"MAX_ENTRIES": int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 1000))},
+        },
+        "response_generations": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "response-generations",
+            "TIMEOUT": None,
+            "OPTIONS": {"MAX_ENTRIES": 1_000_000},  # A handful of keys; never culled
+        },
     }
 
+# Seconds a "not blacklisted" answer for a refresh token may be cached (app1/tokens.py).
+# Only safe to raise with a shared cache, where blacklisting updates every worker.
+JWT_BLACKLIST_NEGATIVE_TTL = int(os.environ.get(
+    "JWT_BLACKLIST_NEGATIVE_TTL", 300 if os.environ.get("REDIS_URL") else 0))
+
+
+# Password hashing
+# PASSWORD_HASHER picks the algorithm for new hashes ("pbkdf2", "scrypt" or
+# "argon2", which needs argon2-cffi). The other hashers stay listed so existing
+# hashes still verify; they are rehashed with the current one on the next login.
+
+_PASSWORD_HASHERS = {
+    "pbkdf2": "app1.hashers.TunedPBKDF2PasswordHasher",
+    "scrypt": "app1.hashers.TunedScryptPasswordHasher",
+    "argon2": "app1.hashers.TunedArgon2PasswordHasher",
+}
+PASSWORD_HASHER = os.environ.get("PASSWORD_HASHER", "pbkdf2")
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    path for name, path in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+]
+
+# Cost parameters; unset values fall back to Django's defaults for the algorithm
+PASSWORD_HASH_PARAMS = {
+    name: int(value)
+    for name, value in (
+        ("pbkdf2_iterations", os.environ.get("PBKDF2_ITERATIONS")),
+        ("scrypt_work_factor", os.environ.get("SCRYPT_WORK_FACTOR")),
+        ("scrypt_block_size", os.environ.get("SCRYPT_BLOCK_SIZE")),
+        ("scrypt_parallelism", os.environ.get("SCRYPT_PARALLELISM")),
+        ("argon2_time_cost", os.environ.get("ARGON2_TIME_COST")),
+        ("argon2_memory_cost", os.environ.get("ARGON2_MEMORY_COST")),
+        ("argon2_parallelism", os.environ.get("ARGON2_PARALLELISM")),
+    )
+    if value
+}
+
+
+# Threads the async views use for password hashing; hashlib and argon2 release
+# the GIL, so each thread can keep one core busy without blocking the event loop
+PASSWORD_HASH_POOL_SIZE = int(os.environ.get("PASSWORD_HASH_POOL_SIZE", os.cpu_count() or 1))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -136,13 +306,25 @@ from datetime import timedelta
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=20),
-    "REFRESH_TOKEN_LIFETIME": timedelta(days=1)}
+    "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    "TOKEN_REFRESH_SERIALIZER": "app1.tokens.CachedTokenRefreshSerializer",
+    "TOKEN_VERIFY_SERIALIZER": "app1.tokens.CachedTokenVerifySerializer",
+}
 
 AUTH_USER_MODEL = 'app1.EmployeesModel'
 
+# Stateless JWT mode: requests are authenticated from the token alone (a TokenUser
+# carrying the is_admin claim) instead of loading the employee row every time.
+# Deactivating an employee or revoking admin then takes effect when their access
+# token expires (ACCESS_TOKEN_LIFETIME): token/refresh/ reads both from the
+# employee row, so the next access token carries the current values.
+JWT_STATELESS_AUTH = os.environ.get("JWT_STATELESS_AUTH", "false").lower() in ("1", "true", "yes")
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'app1.tokens.EmployeeJWTStatelessUserAuthentication'
+        if JWT_STATELESS_AUTH else
+        'app1.tokens.EmployeeJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',